@@ -0,0 +1,65 @@
+"""
+Encode time of response body, compression time and redis memory for menu trees.
+
+Run: python -m benchmarks.bench_cache_codecs
+Redis from settings is used for MEMORY USAGE, without it only sizes are shown.
+"""
+import asyncio
+import functools
+import zlib
+
+from aioredis.exceptions import ConnectionError
+from pydantic import TypeAdapter
+
+from benchmarks.utils import generate_menu_tree, measure_sync, report
+from src.core.codecs import ENCODERS
+from src.menus.schemas import MenuWithRelations
+from src.redis_conf import redis
+
+TREES = ((5, 5, 10), (10, 10, 30), (20, 20, 50))
+REPEAT = 30
+COMPRESSION_LEVEL = 3
+
+
+def get_compressors() -> dict:
+    compressors = {
+        'none': (lambda value: value, lambda value: value),
+        'zlib': (lambda value: zlib.compress(value, COMPRESSION_LEVEL), zlib.decompress),
+    }
+    try:
+        import zstandard
+    except ImportError:
+        return compressors
+    compressors['zstd'] = (lambda value: zstandard.compress(value, COMPRESSION_LEVEL), zstandard.decompress)
+    return compressors
+
+
+async def memory_usage(key: str, value: bytes) -> str:
+    try:
+        await redis.set(key, value)
+        usage = await redis.memory_usage(key)
+        await redis.delete(key)
+    except (ConnectionError, OSError):
+        return 'redis unavailable'
+    return f'{usage / 1024:9.1f} KiB in redis'
+
+
+async def main() -> None:
+    adapter = TypeAdapter(list[MenuWithRelations])
+    compressors = get_compressors()
+    for menus, submenus, dishes in TREES:
+        tree = adapter.validate_python(generate_menu_tree(menus, submenus, dishes))
+        print(f'\n{menus} menus, {menus * submenus} submenus, {menus * submenus * dishes} dishes')
+        for name, encoder in ENCODERS.items():
+            print(report(f'encode {name}', measure_sync(functools.partial(encoder, adapter, tree), REPEAT)))
+        body = adapter.dump_json(tree)
+        for name, (compress, decompress) in compressors.items():
+            payload = compress(body)
+            print(report(f'compress {name}', measure_sync(functools.partial(compress, body), REPEAT)))
+            print(report(f'decompress {name}', measure_sync(functools.partial(decompress, payload), REPEAT)))
+            print(f'{name:<40} {len(payload) / 1024:9.1f} KiB, {await memory_usage("bench_codec", payload)}')
+    await redis.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
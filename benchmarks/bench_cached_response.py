@@ -0,0 +1,56 @@
+"""
+Latency of cache hit for /menus/relations/: revalidated schemas vs raw bytes.
+
+Run: python -m benchmarks.bench_cached_response
+"""
+import asyncio
+import functools
+import json
+
+from fastapi import APIRouter, FastAPI
+from fastapi.encoders import jsonable_encoder
+from httpx import AsyncClient
+from pydantic import TypeAdapter
+
+from benchmarks.utils import generate_menu_tree, measure, report
+from src.core.responses import RawJSONResponse
+from src.menus.schemas import MenuWithRelations
+
+MENUS = 10
+SUBMENUS = 10
+DISHES = 30
+REPEAT = 200
+
+adapter = TypeAdapter(list[MenuWithRelations])
+menus = adapter.validate_python(generate_menu_tree(MENUS, SUBMENUS, DISHES))
+# cached value as it was stored by Cache.set before and after
+json_cache = json.dumps(jsonable_encoder(menus))
+bytes_cache = adapter.dump_json(menus)
+
+router = APIRouter()
+
+
+@router.get('/schemas/', response_model=list[MenuWithRelations])
+async def get_with_schemas() -> list[MenuWithRelations]:
+    return [MenuWithRelations.model_validate(menu) for menu in json.loads(json_cache)]
+
+
+@router.get('/bytes/', response_model=list[MenuWithRelations])
+async def get_with_bytes() -> RawJSONResponse:
+    return RawJSONResponse(bytes_cache)
+
+
+app = FastAPI()
+app.include_router(router)
+
+
+async def main() -> None:
+    print(f'{MENUS} menus, {MENUS * SUBMENUS} submenus, {MENUS * SUBMENUS * DISHES} dishes')
+    async with AsyncClient(app=app, base_url='http://bench') as client:
+        for name, url in (('json.loads + model_validate', '/schemas/'), ('pre-serialized bytes', '/bytes/')):
+            await client.get(url)
+            print(report(name, await measure(functools.partial(client.get, url), REPEAT)))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Parse time of admin sheet: rows one by one with iterrows vs whole column operations.
+
+Run: python -m benchmarks.bench_excel_parser
+Sheets are generated in memory, read_excel is not measured.
+"""
+import asyncio
+import functools
+
+import pandas
+
+from benchmarks.utils import generate_admin_sheet, measure, measure_sync, report
+from src.admin.parsers import (
+    DISH_DESC_COL,
+    DISH_DISCOUNT_COL,
+    DISH_ID_COL,
+    DISH_PRICE_COL,
+    DISH_TITLE_COL,
+    MAX_DISCOUNT,
+    MENU_DESC_COL,
+    MENU_ID_COL,
+    MENU_TITLE_COL,
+    MIN_DISCOUNT,
+    PERSENT_COEFF,
+    SUB_DESC_COL,
+    SUB_ID_COL,
+    SUB_TITLE_COL,
+    ExcelParser,
+)
+
+# about 10k and 100k rows
+SHEETS = ((10, 20, 49), (20, 50, 99))
+REPEAT = 3
+
+
+async def get_discount(row: pandas.Series) -> str:
+    discount = 0 if pandas.isnull(row[DISH_DISCOUNT_COL]) else float(row[DISH_DISCOUNT_COL]) / PERSENT_COEFF
+    discount = MIN_DISCOUNT if discount < MIN_DISCOUNT else discount
+    discount = MAX_DISCOUNT if discount > MAX_DISCOUNT else discount
+    return str(discount)
+
+
+async def parse_with_iterrows(excel: pandas.DataFrame) -> dict:
+    """Sheet parsed as it was before column operations."""
+    data: dict = {'menus': {}, 'submenus': {}, 'dishes': {}}
+    for _, row in excel.iterrows():
+        if not pandas.isnull(row[MENU_ID_COL]):
+            menu_id = row[MENU_ID_COL]
+            data['menus'][menu_id] = {
+                'id': menu_id,
+                'title': row[MENU_TITLE_COL],
+                'description': row[MENU_DESC_COL],
+            }
+        elif not pandas.isnull(row[SUB_ID_COL]):
+            submenu_id = row[SUB_ID_COL]
+            data['submenus'][submenu_id] = {
+                'id': submenu_id,
+                'title': row[SUB_TITLE_COL],
+                'description': row[SUB_DESC_COL],
+                'menu_id': menu_id,
+            }
+        elif not pandas.isnull(row[DISH_ID_COL]):
+            dish_id = row[DISH_ID_COL]
+            data['dishes'][dish_id] = {
+                'id': dish_id,
+                'title': row[DISH_TITLE_COL],
+                'description': row[DISH_DESC_COL],
+                'price': row[DISH_PRICE_COL],
+                'discount': await get_discount(row),
+                'menu_id': menu_id,
+                'submenu_id': submenu_id,
+            }
+    return data
+
+
+async def main() -> None:
+    for menus, submenus, dishes in SHEETS:
+        excel = generate_admin_sheet(menus, submenus, dishes)
+        if await parse_with_iterrows(excel) != ExcelParser.parse_frame(excel):
+            raise ValueError('Parsers return different data')
+        print(f'\n{len(excel)} rows')
+        print(report('iterrows', await measure(functools.partial(parse_with_iterrows, excel), REPEAT)))
+        print(report('columns', measure_sync(functools.partial(ExcelParser.parse_frame, excel), REPEAT)))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
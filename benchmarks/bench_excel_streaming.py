@@ -0,0 +1,44 @@
+"""
+Parse time and python memory of admin workbook: pandas DataFrame vs openpyxl read only rows.
+
+Run: python -m benchmarks.bench_excel_streaming
+Generated sheets are written to temporary xlsx files.
+"""
+import asyncio
+import tempfile
+from pathlib import Path
+
+from benchmarks.utils import generate_admin_sheet, measure, peak_memory, report
+from src.admin.parsers import ExcelParser, StreamingExcelParser
+from src.config import settings
+
+# about 10k and 100k rows
+SHEETS = ((10, 20, 49), (20, 50, 99))
+REPEAT = 3
+
+
+async def count_records(parser: StreamingExcelParser) -> int:
+    """Rows consumed by chunks as admin sync does, chunks are not kept."""
+    return sum([
+        sum(len(objects) for objects in chunk.values())
+        async for chunk in parser.iter_chunks(settings.ADMIN_SYNC_CHUNK_SIZE)
+    ])
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for menus, submenus, dishes in SHEETS:
+            path = str(Path(directory) / 'Menu.xlsx')
+            generate_admin_sheet(menus, submenus, dishes).to_excel(path, header=False, index=False)
+            print(f'\n{menus + menus * submenus * (dishes + 1)} rows, {Path(path).stat().st_size / 1024:.0f} KiB')
+            calls = (
+                ('pandas parse', lambda p=path: ExcelParser(source=p).parse()),
+                ('openpyxl parse', lambda p=path: StreamingExcelParser(source=p).parse()),
+                ('openpyxl iter_chunks', lambda p=path: count_records(StreamingExcelParser(source=p))),
+            )
+            for name, call in calls:
+                print(report(name, await measure(call, REPEAT)), await peak_memory(call))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
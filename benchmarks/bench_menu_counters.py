@@ -0,0 +1,95 @@
+"""
+Latency of menus and submenus lists: counts over joins vs counter columns.
+
+Run: python -m benchmarks.bench_menu_counters
+Tables of test db from settings are created, filled and dropped.
+"""
+import asyncio
+import functools
+
+from sqlalchemy import Select, distinct, func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.utils import fill_menu_tree, measure, report
+from src.config import settings
+from src.database import Base
+from src.dishes.models import Dish
+from src.menus.models import Menu
+from src.submenus.models import SubMenu
+
+MENUS = 20
+SUBMENUS = 50
+DISHES = 100
+REPEAT = 30
+
+
+def joined_menus_query() -> Select:
+    """Menus list as it was selected before counter columns."""
+    return (
+        select(
+            Menu.id,
+            Menu.title,
+            Menu.description,
+            func.count(distinct(SubMenu.id)).label('submenus_count'),
+            func.count(distinct(Dish.id)).label('dishes_count'),
+        )
+        .outerjoin(SubMenu, Menu.id == SubMenu.menu_id)
+        .outerjoin(Dish, SubMenu.id == Dish.submenu_id)
+        .group_by(Menu.id)
+    )
+
+
+def joined_submenus_query(menu_id: str) -> Select:
+    """Submenus list as it was selected before counter columns."""
+    return (
+        select(
+            SubMenu.id,
+            SubMenu.title,
+            SubMenu.description,
+            SubMenu.menu_id,
+            func.count(distinct(Dish.id)).label('dishes_count'),
+        )
+        .filter_by(menu_id=menu_id)
+        .outerjoin(Dish, SubMenu.id == Dish.submenu_id)
+        .group_by(SubMenu.id)
+    )
+
+
+def columns_menus_query() -> Select:
+    return select(Menu.id, Menu.title, Menu.description, Menu.submenus_count, Menu.dishes_count)
+
+
+def columns_submenus_query(menu_id: str) -> Select:
+    return select(
+        SubMenu.id,
+        SubMenu.title,
+        SubMenu.description,
+        SubMenu.menu_id,
+        SubMenu.dishes_count,
+    ).filter_by(menu_id=menu_id)
+
+
+async def main() -> None:
+    engine = create_async_engine(settings.db_test_url)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+        menu_id = (await fill_menu_tree(connection, MENUS, SUBMENUS, DISHES))[0]
+        await connection.exec_driver_sql('ANALYZE')
+    print(f'{MENUS} menus, {MENUS * SUBMENUS} submenus, {MENUS * SUBMENUS * DISHES} dishes')
+    queries = (
+        ('menus joined counts', joined_menus_query()),
+        ('menus counter columns', columns_menus_query()),
+        ('submenus joined counts', joined_submenus_query(menu_id)),
+        ('submenus counter columns', columns_submenus_query(menu_id)),
+    )
+    async with engine.connect() as connection:
+        for name, query in queries:
+            print(report(name, await measure(functools.partial(connection.execute, query), REPEAT)))
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Latency and python memory of /menus/relations/ body: orm objects, json aggregated by postgres and stream.
+
+Run: python -m benchmarks.bench_relations_engines
+Tables of test db from settings are created, filled and dropped.
+Orm is skipped for trees bigger than ORM_MAX_DISHES, it needs gigabytes for 1M dishes.
+"""
+import asyncio
+from collections.abc import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from benchmarks.utils import fill_menu_tree, measure, peak_memory, report
+from src.config import settings
+from src.core.cashe import Cache
+from src.core.codecs import encode
+from src.database import Base
+from src.menus.repositories import MenuRepository
+from src.menus.schemas import MenuWithRelations
+from src.menus.services import MenuService, menus_with_relations_adapter
+from src.redis_conf import redis
+
+TREES = ((5, 10, 20), (10, 20, 50), (20, 50, 100), (20, 500, 100))
+ORM_MAX_DISHES = 100_000
+REPEAT = 5
+
+
+async def build_with_orm(session: AsyncSession) -> int:
+    menus = await MenuRepository(session=session).get_with_relations()
+    return len(encode(menus_with_relations_adapter, [MenuWithRelations.model_validate(menu[0]) for menu in menus]))
+
+
+async def build_with_json(session: AsyncSession) -> int:
+    return len(await MenuRepository(session=session).get_with_relations_json())
+
+
+async def build_with_stream(session: AsyncSession) -> int:
+    """Size of streamed body, chunks are dropped as response would send them."""
+    service = MenuService(repository=MenuRepository(session=session), cache=Cache(redis=redis))
+    return sum([len(chunk) async for chunk in service.stream_with_relations()])
+
+
+async def main() -> None:
+    engine = create_async_engine(settings.db_test_url)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    builders = (('orm', build_with_orm), ('json', build_with_json), ('stream', build_with_stream))
+    for menus, submenus, dishes in TREES:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+            await connection.run_sync(Base.metadata.create_all)
+            await fill_menu_tree(connection, menus, submenus, dishes)
+            await connection.exec_driver_sql('ANALYZE')
+        print(f'\n{menus} menus, {menus * submenus} submenus, {menus * submenus * dishes} dishes')
+        for name, build in builders:
+            if name == 'orm' and menus * submenus * dishes > ORM_MAX_DISHES:
+                continue
+
+            async def call(b: Callable = build) -> int:
+                # new session per call, identity map must not keep objects between calls
+                async with session_maker() as session:
+                    return await b(session)
+
+            size = await call()
+            print(report(f'{name} ({size / 1024:.0f} KiB)', await measure(call, REPEAT)), await peak_memory(call))
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+import statistics
+import time
+import tracemalloc
+import uuid
+from collections.abc import Awaitable, Callable
+from decimal import Decimal
+from typing import Any
+
+import pandas
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.menus.models import Menu
+
+
+def generate_menu_tree(menus: int, submenus: int, dishes: int) -> list[dict]:
+    """Menus with relations as they come from MenuRepository.get_with_relations."""
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'title': f'Меню {menu}',
+            'description': f'Описание меню {menu}',
+            'submenus': [
+                {
+                    'id': str(uuid.uuid4()),
+                    'title': f'Подменю {menu}-{submenu}',
+                    'description': f'Описание подменю {menu}-{submenu}',
+                    'dishes': [
+                        {
+                            'id': str(uuid.uuid4()),
+                            'title': f'Блюдо {menu}-{submenu}-{dish}',
+                            'description': f'Описание блюда {menu}-{submenu}-{dish}',
+                            'price': Decimal(f'{dish + 1}.50'),
+                            'discount': Decimal('0.10'),
+                        }
+                        for dish in range(dishes)
+                    ],
+                }
+                for submenu in range(submenus)
+            ],
+        }
+        for menu in range(menus)
+    ]
+
+
+def generate_admin_sheet(menus: int, submenus: int, dishes: int) -> pandas.DataFrame:
+    """Admin sheet as pandas reads it, every tenth dish has discount in percents."""
+    empty = float('nan')
+    rows = []
+    for menu in range(menus):
+        rows.append([str(uuid.uuid4()), f'Меню {menu}', f'Описание меню {menu}', empty, empty, empty, empty])
+        for submenu in range(submenus):
+            rows.append([empty, str(uuid.uuid4()), f'Подменю {submenu}', f'Описание подменю {submenu}'] + [empty] * 3)
+            rows.extend(
+                [
+                    empty,
+                    empty,
+                    str(uuid.uuid4()),
+                    f'Блюдо {dish}',
+                    f'Описание блюда {dish}',
+                    dish + 0.5,
+                    10.0 if dish % 10 == 0 else empty,
+                ]
+                for dish in range(dishes)
+            )
+    return pandas.DataFrame(rows, dtype=object)
+
+
+async def fill_menu_tree(connection: AsyncConnection, menus: int, submenus: int, dishes: int) -> list[str]:
+    """Insert menu tree into db with generate_series, return ids of menus.
+
+    Counter triggers are disabled, tree is uniform and counters are inserted as they are.
+    """
+    await connection.execute(text('ALTER TABLE submenus DISABLE TRIGGER count_submenus'))
+    await connection.execute(text('ALTER TABLE dishes DISABLE TRIGGER count_dishes'))
+    await connection.execute(
+        text(
+            "INSERT INTO menus (id, title, description, submenus_count, dishes_count) "
+            "SELECT gen_random_uuid(), 'Меню ' || menu, 'Описание меню ' || menu, :submenus, :dishes "
+            "FROM generate_series(1, :menus) AS menu",
+        ),
+        {'menus': menus, 'submenus': submenus, 'dishes': submenus * dishes},
+    )
+    await connection.execute(
+        text(
+            "INSERT INTO submenus (id, title, description, menu_id, dishes_count) "
+            "SELECT gen_random_uuid(), 'Под' || menus.title || '-' || submenu, 'Описание подменю', menus.id, :dishes "
+            "FROM menus, generate_series(1, :submenus) AS submenu",
+        ),
+        {'submenus': submenus, 'dishes': dishes},
+    )
+    await connection.execute(
+        text(
+            "INSERT INTO dishes (id, title, description, price, discount, submenu_id) "
+            "SELECT gen_random_uuid(), 'Блюдо ' || dish, 'Описание блюда ' || dish, dish + 0.5, 0.10, submenus.id "
+            "FROM submenus, generate_series(1, :dishes) AS dish",
+        ),
+        {'dishes': dishes},
+    )
+    await connection.execute(text('ALTER TABLE submenus ENABLE TRIGGER count_submenus'))
+    await connection.execute(text('ALTER TABLE dishes ENABLE TRIGGER count_dishes'))
+    return list((await connection.execute(select(Menu.id))).scalars())
+
+
+async def measure(func: Callable[[], Awaitable], repeat: int) -> list[float]:
+    """Duration of each call in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def measure_sync(func: Callable[[], Any], repeat: int) -> list[float]:
+    """Duration of each call of sync function in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+async def peak_memory(func: Callable[[], Awaitable]) -> str:
+    """Peak of python allocations during call."""
+    tracemalloc.start()
+    await func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return f'peak {peak / 1024 / 1024:8.1f} MiB'
+
+
+def report(name: str, durations: list[float]) -> str:
+    """Line with p50 and p99 of durations."""
+    percentiles = statistics.quantiles(durations, n=100)
+    return f'{name:<40} p50={percentiles[49]:8.3f} ms  p99={percentiles[98]:8.3f} ms'
@@ -3,6 +3,7 @@ from logging.config import fileConfig
 from alembic import context
 from sqlalchemy import engine_from_config, pool
 
+from src.admin import models as admin_models
 from src.config import settings
 from src.database import Base
 from src.dishes import models as dishes_models
@@ -0,0 +1,103 @@
+"""add counters
+
+Revision ID: bea006b76925
+Revises: af6cfff85b81
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'bea006b76925'
+down_revision = 'af6cfff85b81'
+branch_labels = None
+depends_on = None
+
+COUNT_SUBMENUS_FUNCTION = """
+CREATE OR REPLACE FUNCTION count_submenus() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.menu_id IS NOT DISTINCT FROM NEW.menu_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE menus
+        SET submenus_count = submenus_count - 1, dishes_count = dishes_count - OLD.dishes_count
+        WHERE id = OLD.menu_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE menus
+        SET submenus_count = submenus_count + 1, dishes_count = dishes_count + NEW.dishes_count
+        WHERE id = NEW.menu_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+COUNT_SUBMENUS_TRIGGER = """
+CREATE TRIGGER count_submenus AFTER INSERT OR DELETE OR UPDATE OF menu_id ON submenus
+FOR EACH ROW EXECUTE FUNCTION count_submenus()
+"""
+COUNT_DISHES_FUNCTION = """
+CREATE OR REPLACE FUNCTION count_dishes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.submenu_id IS NOT DISTINCT FROM NEW.submenu_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE submenus SET dishes_count = dishes_count - 1 WHERE id = OLD.submenu_id;
+        UPDATE menus SET dishes_count = menus.dishes_count - 1
+        FROM submenus WHERE submenus.id = OLD.submenu_id AND menus.id = submenus.menu_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE submenus SET dishes_count = dishes_count + 1 WHERE id = NEW.submenu_id;
+        UPDATE menus SET dishes_count = menus.dishes_count + 1
+        FROM submenus WHERE submenus.id = NEW.submenu_id AND menus.id = submenus.menu_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+COUNT_DISHES_TRIGGER = """
+CREATE TRIGGER count_dishes AFTER INSERT OR DELETE OR UPDATE OF submenu_id ON dishes
+FOR EACH ROW EXECUTE FUNCTION count_dishes()
+"""
+
+
+def upgrade() -> None:
+    op.add_column('menus', sa.Column('submenus_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('menus', sa.Column('dishes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('submenus', sa.Column('dishes_count', sa.Integer(), server_default='0', nullable=False))
+    # tables are locked until commit, so no rows are changed between backfill and triggers
+    op.execute('LOCK TABLE menus, submenus, dishes IN SHARE ROW EXCLUSIVE MODE')
+    op.execute(
+        """
+        UPDATE submenus SET dishes_count = counts.dishes_count
+        FROM (SELECT submenu_id, count(*) AS dishes_count FROM dishes GROUP BY submenu_id) AS counts
+        WHERE submenus.id = counts.submenu_id
+        """,
+    )
+    op.execute(
+        """
+        UPDATE menus SET submenus_count = counts.submenus_count, dishes_count = counts.dishes_count
+        FROM (
+            SELECT menu_id, count(*) AS submenus_count, sum(dishes_count) AS dishes_count
+            FROM submenus GROUP BY menu_id
+        ) AS counts
+        WHERE menus.id = counts.menu_id
+        """,
+    )
+    op.execute(COUNT_SUBMENUS_FUNCTION)
+    op.execute(COUNT_SUBMENUS_TRIGGER)
+    op.execute(COUNT_DISHES_FUNCTION)
+    op.execute(COUNT_DISHES_TRIGGER)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS count_dishes ON dishes')
+    op.execute('DROP FUNCTION IF EXISTS count_dishes')
+    op.execute('DROP TRIGGER IF EXISTS count_submenus ON submenus')
+    op.execute('DROP FUNCTION IF EXISTS count_submenus')
+    op.drop_column('submenus', 'dishes_count')
+    op.drop_column('menus', 'dishes_count')
+    op.drop_column('menus', 'submenus_count')
@@ -0,0 +1,31 @@
+"""add sync state
+
+Revision ID: d41e5c2b7a90
+Revises: bea006b76925
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd41e5c2b7a90'
+down_revision = 'bea006b76925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # empty state makes first sync compare admin data with whole db tree
+    op.create_table(
+        'sync_state',
+        sa.Column('id', sa.UUID(as_uuid=False), nullable=False),
+        sa.Column('hash', sa.String(length=32), nullable=False),
+        sa.Column('menu_id', sa.UUID(as_uuid=False), nullable=True),
+        sa.Column('submenu_id', sa.UUID(as_uuid=False), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sync_state')
@@ -0,0 +1,13 @@
+from sqlalchemy import UUID, Column, String
+
+from src.database import Base
+
+
+class SyncState(Base):
+    """Content hash of admin row written by last successful sync, parents tell kind of row."""
+    __tablename__ = 'sync_state'
+
+    id = Column(UUID(as_uuid=False), primary_key=True)
+    hash = Column(String(length=32), nullable=False)
+    menu_id = Column(UUID(as_uuid=False))
+    submenu_id = Column(UUID(as_uuid=False))
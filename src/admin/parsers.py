@@ -1,7 +1,20 @@
 import abc
+import asyncio
+import functools
+import itertools
+from collections.abc import AsyncIterator, Callable, Generator, Iterator, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import IO, TypeVar
 
+import openpyxl
 import pandas
-from pandas import Series
+from pandas import DataFrame, Series
+
+from src.admin.sources import fetch_source
+from src.config import settings
+
+T = TypeVar('T')
 
 MENU_ID_COL = 0
 MENU_TITLE_COL = 1
@@ -17,6 +30,8 @@ DISH_DESC_COL = 4
 DISH_PRICE_COL = 5
 DISH_DISCOUNT_COL = 6
 
+ROW_LENGTH = 7
+
 PERSENT_COEFF = 100
 MIN_DISCOUNT = 0
 MAX_DISCOUNT = 1
@@ -55,65 +70,192 @@ class BaseParser(abc.ABC):
         """
         ...
 
+    async def iter_chunks(self, size: int) -> AsyncIterator[dict[str, dict[str, dict]]]:
+        """Parsed data by chunks of rows in order of sheet, parents are in the same or earlier chunks.
+
+        Data of parser without streaming is one chunk.
+        """
+        yield await self.parse()
+
 
 class ExcelParser(BaseParser):
     """Parse admin data from excel."""
 
-    def __init__(self, source: str):
+    def __init__(self, source: str | IO[bytes]):
         self.source = source
 
     async def parse(self) -> dict[str, dict[str, dict]]:
-        """Do parse."""
-        excel = pandas.read_excel(self.source, index_col=None, header=None)
-        data: dict = {
-            'menus': {},
-            'submenus': {},
-            'dishes': {},
+        """Do parse, url is downloaded asynchronously and sheet is parsed in executor."""
+        return await run_in_parse_executor(self.read_excel, await fetch_source(self.source))
+
+    @classmethod
+    def read_excel(cls, source: str | IO[bytes]) -> dict[str, dict[str, dict]]:
+        return cls.parse_frame(pandas.read_excel(source, index_col=None, header=None))
+
+    @classmethod
+    def parse_frame(cls, excel: DataFrame) -> dict[str, dict[str, dict]]:
+        """Parse sheet with whole column operations, rows belong to last menu and submenu above them."""
+        is_menu = excel[MENU_ID_COL].notna()
+        is_submenu = ~is_menu & excel[SUB_ID_COL].notna()
+        is_dish = ~is_menu & ~is_submenu & excel[DISH_ID_COL].notna()
+        menu_ids = excel[MENU_ID_COL].ffill()
+        submenu_ids = excel[SUB_ID_COL].where(is_submenu).ffill()
+        menus = DataFrame({
+            'id': excel[MENU_ID_COL],
+            'title': excel[MENU_TITLE_COL],
+            'description': excel[MENU_DESC_COL],
+        })[is_menu]
+        submenus = DataFrame({
+            'id': excel[SUB_ID_COL],
+            'title': excel[SUB_TITLE_COL],
+            'description': excel[SUB_DESC_COL],
+            'menu_id': menu_ids,
+        })[is_submenu]
+        dishes = excel[is_dish]
+        # sheets without filled discounts have no discount column
+        discount_cells = (
+            dishes[DISH_DISCOUNT_COL] if DISH_DISCOUNT_COL in dishes.columns
+            else Series(index=dishes.index, dtype=float)
+        )
+        dishes = DataFrame({
+            'id': dishes[DISH_ID_COL],
+            'title': dishes[DISH_TITLE_COL],
+            'description': dishes[DISH_DESC_COL],
+            'price': dishes[DISH_PRICE_COL],
+            'discount': cls._get_discounts(discount_cells),
+            'menu_id': menu_ids[is_dish],
+            'submenu_id': submenu_ids[is_dish],
+        })
+        return {
+            'menus': cls._to_dict_by_id(menus),
+            'submenus': cls._to_dict_by_id(submenus),
+            'dishes': cls._to_dict_by_id(dishes),
         }
 
-        for _, row in excel.iterrows():
-            if not pandas.isnull(row[MENU_ID_COL]):
-                menu_id = row[MENU_ID_COL]
-                data['menus'][menu_id] = {
-                    'id': menu_id,
-                    'title': row[MENU_TITLE_COL],
-                    'description': row[MENU_DESC_COL],
-                }
-            elif not pandas.isnull(row[SUB_ID_COL]):
-                submenu_id = row[SUB_ID_COL]
-                data['submenus'][submenu_id] = {
-                    'id': submenu_id,
-                    'title': row[SUB_TITLE_COL],
-                    'description': row[SUB_DESC_COL],
-                    'menu_id': menu_id,
-                }
-            elif not pandas.isnull(row[DISH_ID_COL]):
-                dish_id = row[DISH_ID_COL]
-                discount = await self._get_discount(row)
-                data['dishes'][dish_id] = {
-                    'id': dish_id,
-                    'title': row[DISH_TITLE_COL],
-                    'description': row[DISH_DESC_COL],
-                    'price': row[DISH_PRICE_COL],
-                    'discount': discount,
-                    'menu_id': menu_id,
-                    'submenu_id': submenu_id,
-                }
-        return data
+    @staticmethod
+    def _get_discounts(cells: Series) -> Series:
+        """Get discounts from cells in percents, empty cells are zero and discounts are clamped."""
+        discounts = cells.astype(float) / PERSENT_COEFF
+        result = discounts.astype(object).map(str)
+        result[discounts.isna() | (discounts < MIN_DISCOUNT)] = str(MIN_DISCOUNT)
+        result[discounts > MAX_DISCOUNT] = str(MAX_DISCOUNT)
+        return result
 
     @staticmethod
-    async def _get_discount(row: Series) -> str:
-        """Get discount from cell."""
+    def _to_dict_by_id(objects: DataFrame) -> dict[str, dict]:
+        """Rows by id, columns are zipped as lists, to_dict boxes every value and it is slower."""
+        fields = list(objects.columns)
+        columns = [objects[field].tolist() for field in fields]
+        records = (dict(zip(fields, values, strict=True)) for values in zip(*columns, strict=True))
+        return {record['id']: record for record in records}
+
+
+class StreamingExcelParser(BaseParser):
+    """Parse admin data from excel row by row, workbook is not loaded into memory."""
+
+    def __init__(self, source: str | IO[bytes]):
+        self.source = source
+
+    async def parse(self) -> dict[str, dict[str, dict]]:
+        """Do parse, url is downloaded asynchronously and rows are read in executor."""
+        parser = StreamingExcelParser(source=await fetch_source(self.source))
+        return await run_in_parse_executor(parser.collect_records)
+
+    async def iter_chunks(self, size: int) -> AsyncIterator[dict[str, dict[str, dict]]]:
+        """Parsed data by chunks of rows, only one chunk is in memory.
+
+        Rows of each chunk are read in thread pool, state of open workbook can not be passed to process pool.
+        """
+        records = StreamingExcelParser(source=await fetch_source(self.source)).iter_records()
+        loop = asyncio.get_running_loop()
         try:
-            discount = 0 if pandas.isnull(row[DISH_DISCOUNT_COL]) else float(row[DISH_DISCOUNT_COL]) / PERSENT_COEFF
-        except KeyError:
-            discount = 0
+            while True:
+                chunk = await loop.run_in_executor(None, collect_chunk, records, size)
+                if not any(chunk.values()):
+                    return
+                yield chunk
+        finally:
+            # workbook is closed by generator
+            records.close()
+
+    def collect_records(self) -> dict[str, dict[str, dict]]:
+        return collect_chunk(self.iter_records())
+
+    def iter_records(self) -> Generator[tuple[str, dict], None, None]:
+        """Yield kind ('menus', 'submenus' or 'dishes') and record of each row of first sheet lazily.
+
+        Source must be path or content, urls are downloaded by parse.
+        """
+        workbook = openpyxl.load_workbook(self.source, read_only=True, data_only=True)
+        # rows above first menu or submenu have no parent, as NaN parents of ExcelParser
+        menu_id = submenu_id = None
+        try:
+            for cells in workbook.worksheets[0].iter_rows(values_only=True):
+                # rows of read only sheet without dimensions are not padded
+                row = cells + (None,) * (ROW_LENGTH - len(cells))
+                if row[MENU_ID_COL] is not None:
+                    menu_id = row[MENU_ID_COL]
+                    yield 'menus', {
+                        'id': menu_id,
+                        'title': row[MENU_TITLE_COL],
+                        'description': row[MENU_DESC_COL],
+                    }
+                elif row[SUB_ID_COL] is not None:
+                    submenu_id = row[SUB_ID_COL]
+                    yield 'submenus', {
+                        'id': submenu_id,
+                        'title': row[SUB_TITLE_COL],
+                        'description': row[SUB_DESC_COL],
+                        'menu_id': menu_id,
+                    }
+                elif row[DISH_ID_COL] is not None:
+                    yield 'dishes', {
+                        'id': row[DISH_ID_COL],
+                        'title': row[DISH_TITLE_COL],
+                        'description': row[DISH_DESC_COL],
+                        'price': row[DISH_PRICE_COL],
+                        'discount': self._get_discount(row[DISH_DISCOUNT_COL]),
+                        'menu_id': menu_id,
+                        'submenu_id': submenu_id,
+                    }
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _get_discount(cell: float | str | datetime | None) -> str:
+        """Get discount from cell as ExcelParser does."""
+        if isinstance(cell, datetime):
+            raise TypeError(f'Discount {cell} is not a number')
+        discount = 0 if cell is None else float(cell) / PERSENT_COEFF
         discount = MIN_DISCOUNT if discount < MIN_DISCOUNT else discount
         discount = MAX_DISCOUNT if discount > MAX_DISCOUNT else discount
         return str(discount)
 
 
-async def parse_db(menus: list) -> dict[str, dict[str, dict]]:
+def collect_chunk(records: Iterator[tuple[str, dict]], size: int | None = None) -> dict[str, dict[str, dict]]:
+    """Collect next records by kind and id, all remaining records when size is not given."""
+    chunk: dict[str, dict[str, dict]] = {
+        'menus': {},
+        'submenus': {},
+        'dishes': {},
+    }
+    for kind, record in itertools.islice(records, size):
+        chunk[kind][record['id']] = record
+    return chunk
+
+
+@functools.cache
+def get_process_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=settings.ADMIN_PARSE_PROCESSES)
+
+
+async def run_in_parse_executor(func: Callable[..., T], *args: object) -> T:
+    """Run CPU heavy parse out of event loop, in default thread pool or in process pool."""
+    executor: Executor | None = get_process_pool() if settings.ADMIN_PARSE_EXECUTOR == 'process' else None
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+async def parse_db(menus: Sequence) -> dict[str, dict[str, dict]]:
     """
     Parse data to special structure for easy compare.
     Return:
@@ -0,0 +1,55 @@
+from collections.abc import Mapping
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.admin.models import SyncState
+
+# rows per statement, asyncpg takes up to 32767 parameters
+BATCH_SIZE = 1000
+
+
+class SyncStateRepository:
+    """Working with db for hashes of last admin sync."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_all(self) -> dict[str, dict[str, dict]]:
+        """Rows of last sync by kind and id, as parse_db returns them."""
+        state: dict[str, dict[str, dict]] = {'menus': {}, 'submenus': {}, 'dishes': {}}
+        rows = await self.session.execute(
+            select(SyncState.id, SyncState.hash, SyncState.menu_id, SyncState.submenu_id),
+        )
+        for row in rows.mappings():
+            state[get_kind(row)][row['id']] = dict(row)
+        return state
+
+    async def save(self, changed: list[dict], deleted: list[str]) -> None:
+        """Upsert hashes of written rows and remove deleted rows."""
+        for start in range(0, len(changed), BATCH_SIZE):
+            query = insert(SyncState).values(changed[start:start + BATCH_SIZE])
+            await self.session.execute(
+                query.on_conflict_do_update(
+                    index_elements=[SyncState.id],
+                    set_={
+                        'hash': query.excluded.hash,
+                        'menu_id': query.excluded.menu_id,
+                        'submenu_id': query.excluded.submenu_id,
+                    },
+                ),
+            )
+        for start in range(0, len(deleted), BATCH_SIZE):
+            await self.session.execute(delete(SyncState).where(SyncState.id.in_(deleted[start:start + BATCH_SIZE])))
+        await self.session.commit()
+
+    async def clear(self) -> None:
+        await self.session.execute(delete(SyncState))
+        await self.session.commit()
+
+
+def get_kind(row: Mapping) -> str:
+    if row['submenu_id'] is not None:
+        return 'dishes'
+    return 'submenus' if row['menu_id'] is not None else 'menus'
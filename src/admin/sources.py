@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO
+
+import httpx
+from aioredis import Redis
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+SOURCE_STATE_KEY = 'admin_source_state'
+RETRY_STATUSES = frozenset({
+    httpx.codes.TOO_MANY_REQUESTS,
+    httpx.codes.INTERNAL_SERVER_ERROR,
+    httpx.codes.BAD_GATEWAY,
+    httpx.codes.SERVICE_UNAVAILABLE,
+    httpx.codes.GATEWAY_TIMEOUT,
+})
+
+
+@dataclass
+class SourceState:
+    """Fingerprint of admin source content, http validators or file stat let skip reading it."""
+    location: str
+    sha256: str
+    etag: str | None = None
+    last_modified: str | None = None
+    mtime_ns: int | None = None
+    size: int | None = None
+
+
+class AdminSource:
+    """Admin workbook from path or url, content is returned only when it changed since last save."""
+
+    def __init__(self, location: str, redis: Redis):
+        self.location = location
+        self.redis = redis
+        # state of last read content, it is saved after successful sync
+        self.state: SourceState | None = None
+
+    async def read_if_changed(self) -> bytes | None:
+        """Content of source, None when it is the same as on last save."""
+        previous = await self.load()
+        if is_url(self.location):
+            content, state = await self._download(previous)
+        else:
+            content, state = await asyncio.to_thread(self._read_file, previous)
+        self.state = state
+        if content is not None and previous is not None and state.sha256 == previous.sha256:
+            # same bytes with new validators, e.g. touched file or server without etag
+            await self.save()
+            return None
+        return content
+
+    async def load(self) -> SourceState | None:
+        raw = await self.redis.get(SOURCE_STATE_KEY)
+        if raw is None:
+            return None
+        state = SourceState(**json.loads(raw))
+        return state if state.location == self.location else None
+
+    async def save(self) -> None:
+        """Remember fingerprint of last read content."""
+        if self.state is not None:
+            await self.redis.set(SOURCE_STATE_KEY, json.dumps(asdict(self.state)))
+
+    def _read_file(self, previous: SourceState | None) -> tuple[bytes | None, SourceState]:
+        path = Path(self.location)
+        stat = path.stat()
+        if previous is not None and (previous.mtime_ns, previous.size) == (stat.st_mtime_ns, stat.st_size):
+            return None, previous
+        content = path.read_bytes()
+        state = SourceState(
+            location=self.location,
+            sha256=hashlib.sha256(content).hexdigest(),
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+        )
+        return content, state
+
+    async def _download(self, previous: SourceState | None) -> tuple[bytes | None, SourceState]:
+        headers = {}
+        if previous is not None and previous.etag:
+            headers['If-None-Match'] = previous.etag
+        if previous is not None and previous.last_modified:
+            headers['If-Modified-Since'] = previous.last_modified
+        response = await fetch(self.location, headers=headers)
+        if previous is not None and response.status_code == httpx.codes.NOT_MODIFIED:
+            return None, previous
+        response.raise_for_status()
+        state = SourceState(
+            location=self.location,
+            sha256=hashlib.sha256(response.content).hexdigest(),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
+        return response.content, state
+
+
+def is_url(location: str) -> bool:
+    return location.startswith(('http://', 'https://'))
+
+
+async def fetch(url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+    """Get url with timeout, connection errors and server errors are retried with exponential backoff.
+
+    Url is requested up to ADMIN_SOURCE_RETRIES + 1 times, error or response of last request is returned as is.
+    """
+    async with httpx.AsyncClient(follow_redirects=True, timeout=settings.ADMIN_SOURCE_TIMEOUT_IN_SECONDS) as client:
+        for attempt in range(settings.ADMIN_SOURCE_RETRIES):
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.TransportError as error:
+                logger.warning('Attempt %s to get %s failed: %r', attempt + 1, url, error)
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                logger.warning('Attempt %s to get %s failed: %s', attempt + 1, url, response.status_code)
+            await asyncio.sleep(settings.ADMIN_SOURCE_RETRY_BACKOFF_IN_SECONDS * 2 ** attempt)
+        # last retry, its errors are raised
+        return await client.get(url, headers=headers)
+
+
+async def fetch_source(source: str | IO[bytes]) -> str | IO[bytes]:
+    """Path or content of excel, body of url is downloaded."""
+    if not isinstance(source, str) or not is_url(source):
+        return source
+    response = await fetch(source)
+    response.raise_for_status()
+    return io.BytesIO(response.content)
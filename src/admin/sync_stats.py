@@ -0,0 +1,32 @@
+import time
+
+from aioredis import Redis
+
+# runs of all celery workers are counted in one redis hash
+SYNC_STATS_KEY = 'admin_sync_stats'
+SYNCED = 'synced'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
+async def record_sync(redis: Redis, status: str, seconds: float) -> None:
+    """Count run of admin sync with its status and duration."""
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hincrby(SYNC_STATS_KEY, f'{status}_runs', 1)
+        pipe.hincrbyfloat(SYNC_STATS_KEY, f'{status}_seconds', seconds)
+        pipe.hset(SYNC_STATS_KEY, mapping={'last_status': status, 'last_run_at': time.time()})
+        await pipe.execute()
+
+
+async def get_sync_stats(redis: Redis) -> dict:
+    """Runs and seconds per status, status and time of last run."""
+    stats = {
+        field.decode(): value.decode() for field, value in (await redis.hgetall(SYNC_STATS_KEY)).items()
+    }
+    report: dict = {}
+    for status in (SYNCED, SKIPPED, FAILED):
+        report[f'{status}_runs'] = int(stats.get(f'{status}_runs', 0))
+        report[f'{status}_seconds'] = float(stats.get(f'{status}_seconds', 0))
+    report['last_status'] = stats.get('last_status')
+    report['last_run_at'] = float(stats['last_run_at']) if 'last_run_at' in stats else None
+    return report
@@ -1,7 +1,12 @@
-from src.admin.parsers import BaseParser, ExcelParser, parse_db
+import hashlib
+import json
+from typing import IO
+
+from src.admin.parsers import BaseParser, ExcelParser, StreamingExcelParser, parse_db
+from src.admin.repositories import SyncStateRepository
 from src.config import settings
 from src.core.cashe import Cache
-from src.database import async_session_maker
+from src.database import async_session_maker, replica_router
 from src.dishes.repositories import DishRepository
 from src.dishes.schemas import CreateDish
 from src.dishes.services import DishService
@@ -21,44 +26,75 @@ class UpdaterDB:
             submenu_service: SubMenuService,
             dish_service: DishService,
             admin_parser: BaseParser,
+            read_repository: MenuRepository | None = None,
+            state_repository: SyncStateRepository | None = None,
     ):
         self.menu_service = menu_service
         self.submenu_service = submenu_service
         self.dish_service = dish_service
         self.admin_parser = admin_parser
+        # current db tree is read from replica, writes go to primary
+        self.read_repository = read_repository or menu_service.repository
+        self.state_repository = state_repository or SyncStateRepository(session=menu_service.repository.session)
+        # hashes of rows written by this sync
+        self.changed_state: list[dict] = []
 
     async def update_db_from_admin_data(self):
-        """Update db from admin data."""
-        db_data = await parse_db(await self.menu_service.repository.get_with_relations())
-        admin_data = await self.admin_parser.parse()
-        db_data = await self._compare_and_update_menus(admin_data, db_data)
-        db_data = await self._compare_and_update_submenus(admin_data, db_data)
-        await self._compare_and_update_dishes(admin_data, db_data)
-        for service in (self.menu_service, self.submenu_service, self.dish_service):
-            await service.background_tasks()
-
-    async def _compare_and_update_menus(self, admin_data: dict, db_data: dict) -> dict:
-        """Update db menus from admin data."""
-        for_create, for_update, for_delete = await self._find_difference(admin_data['menus'], db_data['menus'])
-        await self._delete_objects(service=self.menu_service, objects=for_delete)
+        """Update db from admin data by chunks of rows, only rows changed since last sync are written.
+
+        Compared rows are removed from db data, rows left after last chunk are missing in admin data and deleted.
+        """
+        db_data = await self.state_repository.get_all()
+        if not any(db_data.values()):
+            db_data = await self._get_db_state()
+        try:
+            async for admin_data in self.admin_parser.iter_chunks(settings.ADMIN_SYNC_CHUNK_SIZE):
+                self.changed_state = []
+                await self._create_and_update(admin_data, db_data)
+                await self.state_repository.save(changed=self.changed_state, deleted=[])
+            deleted_ids = [uid for objects in db_data.values() for uid in objects]
+            await self._delete_missing(db_data)
+            await self.state_repository.save(changed=[], deleted=deleted_ids)
+        except Exception:
+            # rows of failed sync are partly written, next sync compares admin data with db tree
+            await self.state_repository.clear()
+            raise
+        finally:
+            # rows committed before failure are changed too
+            for cache in {service.cache for service in (self.menu_service, self.submenu_service, self.dish_service)}:
+                await cache.flush()
+
+    async def _get_db_state(self) -> dict:
+        """Rows of db tree with unknown hashes, all of them are compared as changed."""
+        db_data = await parse_db(await self.read_repository.get_with_relations())
+        if self.read_repository is not self.menu_service.repository:
+            # replica connection is not needed for writes
+            await self.read_repository.session.close()
+        return {kind: {uid: get_state(uid, values, None) for uid, values in objects.items()}
+                for kind, objects in db_data.items()}
+
+    async def _create_and_update(self, admin_data: dict, db_data: dict) -> None:
+        """Create and update rows of chunk, parents first."""
+        for_create, for_update = self._find_difference(admin_data['menus'], db_data['menus'])
         await self._create_menus(menus=for_create)
         await self._update_menus(menus=for_update)
-        return await self._remove_menu_childes(db_data, for_delete) if for_delete else db_data
-
-    async def _compare_and_update_submenus(self, admin_data: dict, db_data: dict) -> dict:
-        """Update db submenus from admin data."""
-        for_create, for_update, for_delete = await self._find_difference(admin_data['submenus'], db_data['submenus'])
-        await self._delete_objects(service=self.submenu_service, objects=for_delete)
+        for_create, for_update = self._find_difference(admin_data['submenus'], db_data['submenus'])
         await self._create_submenus(submenus=for_create)
-        return await self._remove_submenu_childes(db_data, for_delete) if for_delete else db_data
-
-    async def _compare_and_update_dishes(self, admin_data: dict, db_data: dict) -> None:
-        """Update db dishes from admin data."""
-        for_create, for_update, for_delete = await self._find_difference(admin_data['dishes'], db_data['dishes'])
-        await self._delete_objects(service=self.dish_service, objects=for_delete)
+        await self._update_submenus(submenus=for_update)
+        for_create, for_update = self._find_difference(admin_data['dishes'], db_data['dishes'])
         await self._create_dishes(dishes=for_create)
         await self._update_dishes(dishes=for_update)
 
+    async def _delete_missing(self, db_data: dict) -> None:
+        """Delete rows missing in admin data, children of deleted rows are deleted with them."""
+        for_delete = get_for_delete(db_data['menus'])
+        await self._delete_objects(service=self.menu_service, objects=for_delete)
+        db_data = await self._remove_menu_childes(db_data, for_delete) if for_delete else db_data
+        for_delete = get_for_delete(db_data['submenus'])
+        await self._delete_objects(service=self.submenu_service, objects=for_delete)
+        db_data = await self._remove_submenu_childes(db_data, for_delete) if for_delete else db_data
+        await self._delete_objects(service=self.dish_service, objects=get_for_delete(db_data['dishes']))
+
     async def _create_menus(self, menus: list):
         """Bulk create menus."""
         for menu in menus:
@@ -106,7 +142,7 @@ class UpdaterDB:
     @staticmethod
     async def _remove_menu_childes(db_data: dict, for_delete: list) -> dict:
         """For deleted menus, delete submenus and dishes."""
-        deleted_menu = [item.get('id') for item in for_delete]
+        deleted_menu = {item.get('id') for item in for_delete}
         db_data['submenus'] = {k: v for k, v in db_data['submenus'].items() if v.get('menu_id') not in deleted_menu}
         db_data['dishes'] = {k: v for k, v in db_data['dishes'].items() if v.get('menu_id') not in deleted_menu}
         return db_data
@@ -114,7 +150,7 @@ class UpdaterDB:
     @staticmethod
     async def _remove_submenu_childes(db_data: dict, for_delete: list) -> dict:
         """For deleted submenus, delete dishes."""
-        deleted_submenu = [item.get('id') for item in for_delete]
+        deleted_submenu = {item.get('id') for item in for_delete}
         db_data['dishes'] = {k: v for k, v in db_data['dishes'].items() if v.get('submenu_id') not in deleted_submenu}
         return db_data
 
@@ -124,45 +160,61 @@ class UpdaterDB:
         for obj in objects:
             await service.delete(**obj)
 
-    @staticmethod
-    async def _find_difference(admin_data: dict, db_data: dict) -> tuple[list, list, list]:
-        """Conduct separation objects which need to create, update or delete."""
+    def _find_difference(self, admin_data: dict, db_data: dict) -> tuple[list, list]:
+        """Conduct separation objects which need to create or update, rows are compared by hash.
+
+        Compared rows are removed from db data.
+        """
         for_create = []
         for_update = []
-        for_delete = []
         for uid, data in admin_data.items():
-            db_object = db_data.get(uid)
+            state = get_state(uid, data, get_hash(data))
+            db_object = db_data.pop(uid, None)
             if not db_object:
                 for_create.append(data)
-            elif db_object != data:
+            elif db_object['hash'] != state['hash']:
                 for_update.append(data)
-        for uid, values in db_data.items():
-            if not admin_data.get(uid):
-                data = {'id': uid}
-                if values.get('menu_id'):
-                    data['menu_id'] = values.get('menu_id')
-                if values.get('submenu_id'):
-                    data['submenu_id'] = values.get('submenu_id')
-                for_delete.append(data)
-        return for_create, for_update, for_delete
-
-
-async def get_updater_db() -> UpdaterDB:
-    admin_source = settings.ADMIN_GOOGLE_SHEET if settings.FROM_GOOGLE_SHEETS else settings.ADMIN_EXCEL_PATH
+            else:
+                continue
+            self.changed_state.append(state)
+        return for_create, for_update
+
+
+def get_for_delete(db_data: dict) -> list[dict]:
+    """Arguments of delete for rows, parents of menus and submenus are None."""
+    return [
+        {key: value for key, value in values.items() if key != 'hash' and value is not None}
+        for values in db_data.values()
+    ]
+
+
+def get_hash(data: dict) -> str:
+    """Hash of admin row content."""
+    return hashlib.blake2b(json.dumps(data, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+def get_state(uid: str, data: dict, row_hash: str | None) -> dict:
+    """Row of sync state, parents of menus and submenus are None."""
+    return {'id': uid, 'hash': row_hash, 'menu_id': data.get('menu_id'), 'submenu_id': data.get('submenu_id')}
+
+
+def get_admin_location() -> str:
+    return settings.ADMIN_GOOGLE_SHEET if settings.FROM_GOOGLE_SHEETS else settings.ADMIN_EXCEL_PATH
+
+
+async def get_updater_db(admin_source: str | IO[bytes] | None = None) -> UpdaterDB:
+    """Updater from admin source, content already read from location can be given."""
+    if admin_source is None:
+        admin_source = get_admin_location()
+    admin_parser = StreamingExcelParser if settings.ADMIN_PARSER == 'openpyxl' else ExcelParser
+    read_session = async_session_maker(bind=await replica_router.get_read_engine())
     async with async_session_maker() as session:
-        cache = await anext(get_redis_connection())
+        # one cache for all services, invalidations of whole update are flushed at once
+        cache = Cache(redis=await anext(get_redis_connection()))
         return UpdaterDB(
-            menu_service=MenuService(
-                repository=MenuRepository(session=session),
-                cache=Cache(redis=cache),
-            ),
-            submenu_service=SubMenuService(
-                repository=SubMenuRepository(session=session),
-                cache=Cache(redis=cache),
-            ),
-            dish_service=DishService(
-                repository=DishRepository(session=session),
-                cache=Cache(redis=cache),
-            ),
-            admin_parser=ExcelParser(source=admin_source),
+            menu_service=MenuService(repository=MenuRepository(session=session), cache=cache),
+            submenu_service=SubMenuService(repository=SubMenuRepository(session=session), cache=cache),
+            dish_service=DishService(repository=DishRepository(session=session), cache=cache),
+            admin_parser=admin_parser(source=admin_source),
+            read_repository=MenuRepository(session=read_session),
         )
@@ -1,9 +1,19 @@
 import asyncio
+import io
+import logging
+import time
 
 from celery import Celery
 
-from src.admin.update_db import get_updater_db
+from src.admin.sources import AdminSource
+from src.admin.sync_stats import FAILED, SKIPPED, SYNCED, record_sync
+from src.admin.update_db import get_admin_location, get_updater_db
 from src.config import settings
+from src.database import replica_router
+from src.redis_conf import redis
+from src.warm_up import run_warm_up
+
+logger = logging.getLogger(__name__)
 
 celery_app = Celery('tasks', broker=settings.rabbit_url)
 celery_app.conf.beat_schedule = {
@@ -15,9 +25,31 @@ celery_app.conf.beat_schedule = {
 
 
 async def update_db_async():
-    """Обновление базы."""
-    db_updater = await get_updater_db()
+    """Обновление базы, без изменений в админке база не читается."""
+    started = time.perf_counter()
+    status = FAILED
+    try:
+        status = await sync_admin_data()
+    finally:
+        await record_sync(redis, status, time.perf_counter() - started)
+    logger.info('Admin sync %s in %.3f s', status, time.perf_counter() - started)
+
+
+async def sync_admin_data() -> str:
+    """Обновление базы и кеша, если админка изменилась c последнего обновления."""
+    admin_source = AdminSource(location=get_admin_location(), redis=redis)
+    content = None
+    if settings.ADMIN_SKIP_UNCHANGED:
+        content = await admin_source.read_if_changed()
+        if content is None:
+            return SKIPPED
+    db_updater = await get_updater_db(admin_source=io.BytesIO(content) if content is not None else None)
     await db_updater.update_db_from_admin_data()
+    await admin_source.save()
+    # warm up reads what was just written, replicas may not have it yet
+    await replica_router.mark_write()
+    await run_warm_up()
+    return SYNCED
 
 
 @celery_app.task
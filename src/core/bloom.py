@@ -0,0 +1,80 @@
+import hashlib
+import uuid
+
+from aioredis import Redis
+from aioredis.exceptions import WatchError
+
+
+class BloomFilter:
+    """Filter of existing ids on redis bitmap, it gives false positives but never false negatives."""
+
+    def __init__(self, redis: Redis, name: str, size: int, hashes: int):
+        self.redis = redis
+        self.size = size
+        self.hashes = hashes
+        self.key = f'bloom_{name}'
+        self.rebuild_key = f'bloom_{name}_rebuild'
+        self.ready_key = f'bloom_{name}_ready'
+        # one rebuild at a time, other rebuild would clear bitmap being filled
+        self.lock_key = f'bloom_{name}_rebuild_lock'
+
+    def get_positions(self, item: str) -> list[int]:
+        """Bits of item, double hashing of one digest."""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    async def add(self, *items: str) -> None:
+        """Add items, they are also added to filter being rebuilt."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for item in items:
+                for position in self.get_positions(item):
+                    pipe.setbit(self.key, position, 1)
+                    pipe.setbit(self.rebuild_key, position, 1)
+            await pipe.execute()
+
+    async def may_contain(self, item: str) -> bool:
+        """Check item, until filter is filled from db every item may exist."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(self.ready_key)
+            for position in self.get_positions(item):
+                pipe.getbit(self.key, position)
+            ready, *bits = await pipe.execute()
+        return not ready or all(bits)
+
+    async def start_rebuild(self, timeout: float) -> str | None:
+        """Start rebuild, must be called before items are read from db.
+
+        Return token of rebuild, None when other process holds lock of rebuild for up to timeout seconds.
+        """
+        token = uuid.uuid4().hex
+        if not await self.redis.set(self.lock_key, token, nx=True, px=int(timeout * 1000)):
+            return None
+        await self.redis.delete(self.rebuild_key)
+        return token
+
+    async def finish_rebuild(self, token: str, items: list[str]) -> bool:
+        """Replace filter with items read from db and items added since start of rebuild.
+
+        Filter is kept when lock of rebuild expired, other rebuild may have cleared bitmap since then.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            # allocates whole bitmap, rename needs existing key even without items
+            pipe.setbit(self.rebuild_key, self.size - 1, 0)
+            for item in items:
+                for position in self.get_positions(item):
+                    pipe.setbit(self.rebuild_key, position, 1)
+            await pipe.execute()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(self.lock_key)
+                if await pipe.get(self.lock_key) != token.encode():
+                    return False
+                pipe.multi()
+                pipe.rename(self.rebuild_key, self.key)
+                pipe.set(self.ready_key, 1)
+                pipe.delete(self.lock_key)
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
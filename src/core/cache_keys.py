@@ -0,0 +1,128 @@
+import re
+import uuid
+from dataclasses import dataclass
+
+from src.core.pagination import PageParams
+
+# namespace of all menus, lists and tree of menus depend on it
+MENUS_NAMESPACE = 'menus'
+FAMILIES = ('menus', 'relations', 'menu', 'submenus', 'submenu', 'dishes', 'dish')
+# names of keys per family, ids have no underscores, lists may be split in pages
+PAGE_NAME_PATTERN = r'(_page_\d+_[^_]+)?'
+FAMILY_NAME_PATTERNS = (
+    ('menus', re.compile(r'menus' + PAGE_NAME_PATTERN)),
+    ('relations', re.compile(r'menus_relations')),
+    ('menu', re.compile(r'menu_[^_]+')),
+    ('submenus', re.compile(r'menu_[^_]+_submenus' + PAGE_NAME_PATTERN)),
+    ('submenu', re.compile(r'menu_[^_]+_submenu_[^_]+')),
+    ('dishes', re.compile(r'menu_[^_]+_submenu_[^_]+_dishes' + PAGE_NAME_PATTERN)),
+    ('dish', re.compile(r'menu_[^_]+_submenu_[^_]+_dish_[^_]+')),
+)
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    """Logical key of cache, stored value also depends on generations of namespaces."""
+    name: str
+    family: str
+    namespaces: tuple[str, ...]
+    # id of looked up object, families of objects are named as their models
+    object_id: str | None = None
+
+    def with_generations(self, generations: list[bytes | None]) -> str:
+        """Key in redis for generations of namespaces."""
+        return f"{self.name}:{'.'.join((generation or b'0').decode() for generation in generations)}"
+
+
+def menu_namespace(menu_id: uuid.UUID | str) -> str:
+    """Namespace of menu and all its submenus and dishes."""
+    return f'menu_{menu_id}'
+
+
+def submenu_namespace(menu_id: uuid.UUID | str, submenu_id: uuid.UUID | str) -> str:
+    """Namespace of submenu and all its dishes."""
+    return f'menu_{menu_id}_submenu_{submenu_id}'
+
+
+def get_key_namespaces(keys: list[CacheKey]) -> list[str]:
+    """Namespaces of keys without repeats."""
+    return list(dict.fromkeys(namespace for key in keys for namespace in key.namespaces))
+
+
+def get_page_suffix(page: PageParams | None) -> str:
+    """Part of list key name for page, pages live in namespaces of whole list."""
+    if page is None:
+        return ''
+    return f"_page_{page.limit}_{page.after or 'first'}"
+
+
+def get_name_family(name: str) -> str | None:
+    """Family of logical key name."""
+    for family, pattern in FAMILY_NAME_PATTERNS:
+        if pattern.fullmatch(name):
+            return family
+    return None
+
+
+def get_namespace_families(namespace: str) -> tuple[str, ...]:
+    """Families of keys which depend on namespace."""
+    if namespace == MENUS_NAMESPACE:
+        return 'menus', 'relations'
+    if '_submenu_' in namespace:
+        return 'submenu', 'dishes', 'dish'
+    return 'menu', 'submenus', 'submenu', 'dishes', 'dish'
+
+
+def menus_key(page: PageParams | None = None) -> CacheKey:
+    return CacheKey(name=f'menus{get_page_suffix(page)}', family='menus', namespaces=(MENUS_NAMESPACE,))
+
+
+def relations_key() -> CacheKey:
+    return CacheKey(name='menus_relations', family='relations', namespaces=(MENUS_NAMESPACE,))
+
+
+def menu_key(menu_id: uuid.UUID | str) -> CacheKey:
+    return CacheKey(
+        name=f'menu_{menu_id}',
+        family='menu',
+        namespaces=(menu_namespace(menu_id),),
+        object_id=str(menu_id),
+    )
+
+
+def submenus_key(menu_id: uuid.UUID | str, page: PageParams | None = None) -> CacheKey:
+    return CacheKey(
+        name=f'menu_{menu_id}_submenus{get_page_suffix(page)}',
+        family='submenus',
+        namespaces=(menu_namespace(menu_id),),
+    )
+
+
+def submenu_key(menu_id: uuid.UUID | str, submenu_id: uuid.UUID | str) -> CacheKey:
+    return CacheKey(
+        name=f'menu_{menu_id}_submenu_{submenu_id}',
+        family='submenu',
+        namespaces=(menu_namespace(menu_id), submenu_namespace(menu_id, submenu_id)),
+        object_id=str(submenu_id),
+    )
+
+
+def dishes_key(
+    menu_id: uuid.UUID | str,
+    submenu_id: uuid.UUID | str,
+    page: PageParams | None = None,
+) -> CacheKey:
+    return CacheKey(
+        name=f'menu_{menu_id}_submenu_{submenu_id}_dishes{get_page_suffix(page)}',
+        family='dishes',
+        namespaces=(menu_namespace(menu_id), submenu_namespace(menu_id, submenu_id)),
+    )
+
+
+def dish_key(menu_id: uuid.UUID | str, submenu_id: uuid.UUID | str, dish_id: uuid.UUID | str) -> CacheKey:
+    return CacheKey(
+        name=f'menu_{menu_id}_submenu_{submenu_id}_dish_{dish_id}',
+        family='dish',
+        namespaces=(menu_namespace(menu_id), submenu_namespace(menu_id, submenu_id)),
+        object_id=str(dish_id),
+    )
@@ -0,0 +1,41 @@
+from aioredis import Redis
+
+from src.core.cache_keys import FAMILIES, get_name_family
+
+SCAN_BATCH_SIZE = 500
+STALE_PREFIXES = ('stale_since_', 'stale_')
+
+
+def get_key_group(key: str) -> tuple[str, bool]:
+    """Family of redis key and flag of stale copy, keys of other data belong to group other."""
+    name, is_stale = key.split(':', 1)[0], False
+    for prefix in STALE_PREFIXES:
+        if name.startswith(prefix):
+            name, is_stale = name.removeprefix(prefix), True
+            break
+    return get_name_family(name) or 'other', is_stale
+
+
+async def get_memory_report(redis: Redis) -> dict[str, dict[str, int]]:
+    """Count keys and memory per family, walks whole keyspace with SCAN."""
+    report = {family: {'keys': 0, 'stale_keys': 0, 'memory_bytes': 0} for family in (*FAMILIES, 'other')}
+    keys = []
+    async for key in redis.scan_iter(count=SCAN_BATCH_SIZE):
+        keys.append(key)
+        if len(keys) >= SCAN_BATCH_SIZE:
+            await _add_to_report(redis, report, keys)
+            keys = []
+    await _add_to_report(redis, report, keys)
+    return report
+
+
+async def _add_to_report(redis: Redis, report: dict[str, dict[str, int]], keys: list[bytes]) -> None:
+    """Add memory of keys read in one pipeline."""
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.memory_usage(key)
+        usages = await pipe.execute()
+    for key, usage in zip(keys, usages, strict=True):
+        family, is_stale = get_key_group(key.decode())
+        report[family]['stale_keys' if is_stale else 'keys'] += 1
+        report[family]['memory_bytes'] += usage or 0
@@ -0,0 +1,89 @@
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+
+from src.core.cache_keys import FAMILIES
+from src.core.local_cache import LocalCache
+
+# name, help and field of counters in prometheus format
+METRICS = (
+    ('cache_hits_total', 'Values found in cache.', 'hits'),
+    ('cache_misses_total', 'Values not found in cache.', 'misses'),
+    ('cache_stale_hits_total', 'Outdated values served while refreshed.', 'stale_hits'),
+    ('cache_not_modified_total', 'Responses without body for actual etag.', 'not_modified'),
+    ('cache_sets_total', 'Values built and set.', 'sets'),
+    ('cache_set_bytes_total', 'Size of set values.', 'set_bytes'),
+    ('cache_oversized_total', 'Values not cached because of size budget.', 'oversized'),
+    ('cache_invalidations_total', 'Invalidations of namespaces the family depends on.', 'invalidations'),
+    ('cache_lookups_total', 'Lookups of values in cache.', 'lookups'),
+    ('cache_lookup_seconds_total', 'Time of lookups, including redis round trips.', 'lookup_seconds'),
+    ('cache_build_seconds_total', 'Time of building values from db.', 'build_seconds'),
+)
+
+
+@dataclass
+class FamilyStats:
+    """Counters of one key family."""
+    hits: int = 0
+    misses: int = 0
+    stale_hits: int = 0
+    not_modified: int = 0
+    sets: int = 0
+    set_bytes: int = 0
+    oversized: int = 0
+    invalidations: int = 0
+    lookups: int = 0
+    lookup_seconds: float = 0.0
+    build_seconds: float = 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Part of lookups served from cache."""
+        total = self.hits + self.misses + self.stale_hits
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+
+class CacheStats:
+    """Counters of cache per key family, they are kept per process."""
+
+    def __init__(self):
+        self.families: defaultdict[str, FamilyStats] = defaultdict(FamilyStats)
+        self.reset()
+
+    def __getitem__(self, family: str) -> FamilyStats:
+        return self.families[family]
+
+    def reset(self) -> None:
+        """Reset all counters, known families are shown with zeros."""
+        self.families.clear()
+        for family in FAMILIES:
+            self.families[family] = FamilyStats()
+
+    def to_dict(self, local: LocalCache | None = None) -> dict:
+        """Counters for stats endpoint."""
+        return {
+            'families': {
+                family: {**asdict(stats), 'hit_ratio': stats.hit_ratio} for family, stats in self.families.items()
+            },
+            'local': local.stats() if local is not None else None,
+        }
+
+    def to_prometheus(self, local: LocalCache | None = None) -> str:
+        """Counters in prometheus text format."""
+        lines = []
+        for name, description, field in METRICS:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for family, stats in self.families.items():
+                lines.append(f'{name}{{family="{family}"}} {getattr(stats, field)}')
+        if local is not None:
+            for name, metric_type, value in (
+                ('cache_local_hits_total', 'counter', local.hits),
+                ('cache_local_misses_total', 'counter', local.misses),
+                ('cache_local_size', 'gauge', len(local.data)),
+            ):
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+cache_stats = CacheStats()
@@ -1,41 +1,459 @@
-import json
-from typing import Annotated, TypeVar
+import asyncio
+import contextlib
+import functools
+import hashlib
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Annotated
 
 from aioredis import Redis
-from fastapi import Depends
-from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel
+from aioredis.exceptions import LockError
+from fastapi import BackgroundTasks, Depends, HTTPException, status
 
+from src.config import settings
+from src.core.bloom import BloomFilter
+from src.core.cache_keys import (
+    CacheKey,
+    get_key_namespaces,
+    get_name_family,
+    get_namespace_families,
+)
+from src.core.cache_stats import cache_stats
+from src.core.codecs import compress, decompress
+from src.core.local_cache import LocalCache, get_invalidation_message, local_cache
+from src.core.responses import CachedBody, etag_matches
+from src.core.single_flight import single_flight
+from src.database import RECENT_WRITE_KEY, get_recent_write_ttl
 from src.redis_conf import get_redis_connection
 
-T_Schema = TypeVar('T_Schema', bound=BaseModel)
+# random value, changes after redis flush so etags of reset generations never repeat
+EPOCH_KEY = 'cache_epoch'
+# generations of all namespaces are values of one counter, generation of expired key is never given again
+GENERATION_CLOCK_KEY = 'generation_clock'
+# KEYS: clock and generation keys, ARGV: ttl of generation keys and NX to set only missing keys,
+# generation is above current ones, they may be set by counters of namespaces without clock
+SET_GENERATIONS_SCRIPT = """
+local generation = redis.call('INCR', KEYS[1])
+for index = 2, #KEYS do
+    generation = math.max(generation, (tonumber(redis.call('GET', KEYS[index])) or 0) + 1)
+end
+redis.call('SET', KEYS[1], generation)
+for index = 2, #KEYS do
+    if ARGV[2] == 'NX' then
+        redis.call('SET', KEYS[index], generation, 'EX', ARGV[1], 'NX')
+    else
+        redis.call('SET', KEYS[index], generation, 'EX', ARGV[1])
+    end
+end
+return generation
+"""
+# not found result is cached as marker with detail of error, json bodies never start with 0xfe
+NOT_FOUND_MARKER = b'\xfe'
+
+
+def get_generation_key(namespace: str) -> str:
+    """Key of generation of namespace."""
+    return f'generation_{namespace}'
+
+
+def get_generation_ttl() -> int:
+    """Ttl of generation, namespaces of deleted objects are removed by it.
+
+    Values of namespace live shorter, new generation given after expiry only drops them earlier.
+    """
+    return 2 * max([settings.CACHE_TTL_IN_SECONDS, *settings.CACHE_FAMILY_TTL_IN_SECONDS.values()])
+
+
+def get_stale_key(name: str) -> str:
+    """Key of last built value, it survives invalidation."""
+    return f'stale_{name}'
+
+
+def get_stale_since_key(name: str) -> str:
+    """Key of time when value was found outdated first time."""
+    return f'stale_since_{name}'
+
+
+def get_ttl(family: str | None) -> int:
+    """Ttl of family values, keys without family get default ttl."""
+    if family is None:
+        return settings.CACHE_TTL_IN_SECONDS
+    return settings.CACHE_FAMILY_TTL_IN_SECONDS.get(family, settings.CACHE_TTL_IN_SECONDS)
+
+
+def get_max_size(family: str) -> int:
+    """Max size of family body in bytes."""
+    return settings.CACHE_FAMILY_MAX_SIZE_IN_BYTES.get(family, settings.CACHE_MAX_SIZE_IN_BYTES)
+
+
+def raise_for_not_found(value: bytes) -> bytes:
+    """Raise cached not found error or return value."""
+    if value.startswith(NOT_FOUND_MARKER):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=value[1:].decode())
+    return value
+
+
+def get_bloom_filter(redis: Redis, family: str) -> BloomFilter:
+    """Filter of existing ids of family."""
+    return BloomFilter(redis, family, size=settings.CACHE_BLOOM_SIZE_IN_BITS, hashes=settings.CACHE_BLOOM_HASHES)
 
 
 class Cache:
-    """Manager of cache."""
+    """Manager of cache, values are ready to send response bodies."""
 
-    def __init__(self, redis: Redis):
+    def __init__(
+        self,
+        redis: Redis,
+        local: LocalCache | None = None,
+        background_tasks: BackgroundTasks | None = None,
+    ):
         self.redis = redis
+        self.local = local
+        self.background_tasks = background_tasks
+        # namespaces invalidated by request, they are bumped by one flush
+        self.pending_namespaces: set[str] = set()
 
-    async def get(self, key: str) -> dict | list | None:
+    async def get(self, key: str) -> bytes | None:
         """Get cache."""
-        result = await self.redis.get(key)
-        return json.loads(result) if result else None
+        return (await self.get_many([key]))[0]
 
-    async def set(self, key: str, value: T_Schema | list[T_Schema]) -> None:
-        """Set cache."""
-        await self.redis.set(key, json.dumps(jsonable_encoder(value)))
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        """Get cache of keys, keys missing in memory are read by one MGET."""
+        values: list[bytes | None] = [None] * len(keys)
+        if self.local is not None:
+            values = [self.local.get(key) for key in keys]
+        missing = [index for index, value in enumerate(values) if value is None]
+        if not missing:
+            return values
+        for index, value in zip(missing, await self.redis.mget([keys[index] for index in missing]), strict=True):
+            if value is None:
+                continue
+            body = decompress(value)
+            values[index] = body
+            if self.local is not None:
+                self.local.set(keys[index], body)
+        return values
 
-    async def clear(self, key: str, *keys: str) -> None:
-        """Clear cache for key/keys."""
-        await self.redis.delete(key, *keys)
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        stale_name: str | None = None,
+        family: str | None = None,
+    ) -> None:
+        """Set cache with ttl of family, keep copy under stale name for stale reads."""
+        await self.set_many(
+            {key: value},
+            stale_names={key: stale_name} if stale_name else None,
+            families={key: family} if family else None,
+        )
+
+    async def set_many(
+        self,
+        values: dict[str, bytes],
+        stale_names: dict[str, str] | None = None,
+        families: dict[str, str] | None = None,
+        ttl: int | None = None,
+    ) -> None:
+        """Set cache of keys in one pipeline, keep copies under stale names for stale reads.
+
+        Values bigger than max size of their family are not cached, ttl of family is used when ttl is not given.
+        """
+        stale_names = stale_names or {}
+        families = families or {}
+        values = {key: value for key, value in values.items() if self._fits(families.get(key), value)}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                payload = compress(value)
+                key_ttl = ttl or get_ttl(families.get(key))
+                pipe.set(key, payload, ex=key_ttl)
+                stale_name = stale_names.get(key)
+                if stale_name is not None:
+                    pipe.set(get_stale_key(stale_name), payload, ex=key_ttl)
+                    pipe.delete(get_stale_since_key(stale_name))
+            await pipe.execute()
+        if self.local is not None:
+            for key, value in values.items():
+                self.local.set(key, value)
+
+    @staticmethod
+    def _fits(family: str | None, value: bytes) -> bool:
+        """Check size budget of family and count set or oversized value."""
+        if family is None:
+            return True
+        stats = cache_stats[family]
+        if len(value) > get_max_size(family):
+            stats.oversized += 1
+            return False
+        stats.sets += 1
+        stats.set_bytes += len(value)
+        return True
 
-    async def clear_by_mask(self, key_mask: str) -> None:
-        """Clear cache for all keys what contain mask."""
-        keys = await self.redis.keys(f'{key_mask}*')
-        if keys:
-            await self.clear(*keys)
+    async def get_or_set(self, key: str, factory: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Get cache or build it, only one coroutine per key builds the value."""
+        value = await self.get(key)
+        if value is not None:
+            return value
+        return await self._build_once(key, factory)
+
+    async def get_cached_body(
+        self,
+        key: CacheKey,
+        factory: Callable[[], Awaitable[bytes]],
+        if_none_match: str | None = None,
+    ) -> CachedBody:
+        """Get body with etag, body is not loaded when client has actual version."""
+        stats = cache_stats[key.family]
+        if not await self.may_exist(key):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'{key.family} not found')
+        started = time.perf_counter()
+        redis_key, etag = await self.resolve(key)
+        if if_none_match is not None and etag_matches(etag, if_none_match):
+            stats.not_modified += 1
+            return CachedBody(etag=etag)
+        body = await self.get(redis_key)
+        stats.lookups += 1
+        stats.lookup_seconds += time.perf_counter() - started
+        if body is not None:
+            stats.hits += 1
+            return CachedBody(etag=etag, body=raise_for_not_found(body))
+        factory = self._measure_build(key.family, factory)
+        build_once = functools.partial(self._build_once, family=key.family)
+        max_staleness = settings.CACHE_MAX_STALENESS_IN_SECONDS.get(key.family)
+        if max_staleness is None or self.background_tasks is None:
+            stats.misses += 1
+            return CachedBody(etag=etag, body=raise_for_not_found(await build_once(redis_key, factory)))
+        stale_body = await self._get_stale(key.name, max_staleness)
+        if stale_body is None:
+            stats.misses += 1
+            body = await build_once(redis_key, factory, stale_name=key.name)
+            return CachedBody(etag=etag, body=raise_for_not_found(body))
+        stats.stale_hits += 1
+        # refresh runs after response, but before db session of request is closed
+        self.background_tasks.add_task(build_once, redis_key, factory, stale_name=key.name)
+        # etag of actual generations must not be sent with outdated body
+        return CachedBody(body=stale_body)
+
+    @staticmethod
+    def _measure_build(family: str, factory: Callable[[], Awaitable[bytes]]) -> Callable[[], Awaitable[bytes]]:
+        """Factory counting build time of family."""
+        async def build() -> bytes:
+            started = time.perf_counter()
+            value = await factory()
+            cache_stats[family].build_seconds += time.perf_counter() - started
+            return value
+        return build
+
+    async def may_exist(self, key: CacheKey) -> bool:
+        """Check looked up object in filter of existing ids."""
+        if not settings.CACHE_BLOOM_ENABLED or key.object_id is None:
+            return True
+        return await get_bloom_filter(self.redis, key.family).may_contain(key.object_id)
+
+    async def mark_existing(self, key: CacheKey) -> None:
+        """Add created object to filter of existing ids, before response with its id."""
+        if settings.CACHE_BLOOM_ENABLED and key.object_id is not None:
+            await get_bloom_filter(self.redis, key.family).add(key.object_id)
+
+    async def resolve(self, key: CacheKey) -> tuple[str, str]:
+        """Key in redis for actual generations of namespaces and its strong etag."""
+        generations = await self._get_generations(
+            EPOCH_KEY,
+            *[get_generation_key(namespace) for namespace in key.namespaces],
+        )
+        epoch = generations[0]
+        if epoch is None:
+            await self.redis.set(EPOCH_KEY, uuid.uuid4().hex, nx=True)
+            return await self.resolve(key)
+        if None in generations:
+            await self._set_missing_generations(key.namespaces, generations[1:])
+            return await self.resolve(key)
+        redis_key = key.with_generations(generations[1:])
+        digest = hashlib.blake2b(redis_key.encode(), digest_size=16)
+        digest.update(b':' + epoch)
+        return redis_key, f'"{digest.hexdigest()}"'
+
+    async def resolve_many(
+        self,
+        keys: list[CacheKey],
+        generations: dict[str, bytes | None] | None = None,
+    ) -> list[str]:
+        """Keys in redis for generations of namespaces, actual generations are read by one MGET when not given."""
+        if generations is None:
+            generations = await self.get_generations(get_key_namespaces(keys))
+        return [key.with_generations([generations[namespace] for namespace in key.namespaces]) for key in keys]
+
+    async def get_generations(self, namespaces: list[str]) -> dict[str, bytes | None]:
+        """Get generations of namespaces by one MGET, missing generations are set."""
+        generations = await self._get_generations(*[get_generation_key(namespace) for namespace in namespaces])
+        if None in generations:
+            await self._set_missing_generations(namespaces, generations)
+            return await self.get_generations(namespaces)
+        return dict(zip(namespaces, generations, strict=True))
+
+    async def _set_missing_generations(self, namespaces: Sequence[str], generations: list[bytes | None]) -> None:
+        """Give new generation to namespaces without it, generation set by other instance is kept."""
+        script = self.redis.register_script(SET_GENERATIONS_SCRIPT)
+        await script(
+            keys=[
+                GENERATION_CLOCK_KEY,
+                *[
+                    get_generation_key(namespace)
+                    for namespace, generation in zip(namespaces, generations, strict=True)
+                    if generation is None
+                ],
+            ],
+            args=[get_generation_ttl(), 'NX'],
+        )
+
+    async def set_bodies(self, bodies: list[tuple[CacheKey, bytes]], redis_keys: list[str] | None = None) -> None:
+        """Set bodies for given keys in redis or for actual generations of namespaces."""
+        if redis_keys is None:
+            redis_keys = await self.resolve_many([key for key, _ in bodies])
+        await self.set_many(
+            {redis_key: body for redis_key, (_, body) in zip(redis_keys, bodies, strict=True)},
+            stale_names={
+                redis_key: key.name
+                for redis_key, (key, _) in zip(redis_keys, bodies, strict=True)
+                if key.family in settings.CACHE_MAX_STALENESS_IN_SECONDS
+            },
+            families={redis_key: key.family for redis_key, (key, _) in zip(redis_keys, bodies, strict=True)},
+        )
+
+    async def get_generation(self, namespace: str) -> bytes | None:
+        """Get generation of namespace from redis."""
+        return await self.redis.get(get_generation_key(namespace))
+
+    async def _get_stale(self, name: str, max_staleness: int) -> bytes | None:
+        """Get outdated value, if it is outdated not longer than max staleness."""
+        now = int(time.time())
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(get_stale_since_key(name), now, nx=True, ex=get_ttl(get_name_family(name)))
+            pipe.get(get_stale_since_key(name))
+            pipe.get(get_stale_key(name))
+            _, stale_since, value = await pipe.execute()
+        if value is None or now - int(stale_since) > max_staleness:
+            return None
+        return decompress(value)
+
+    async def _build_once(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[bytes]],
+        stale_name: str | None = None,
+        family: str | None = None,
+    ) -> bytes:
+        """Build value, concurrent callers for the same key wait for one build."""
+        return await single_flight.do(key, lambda: self._build(key, factory, stale_name=stale_name, family=family))
+
+    async def _get_generations(self, *generation_keys: str) -> list[bytes | None]:
+        """Get generations, from memory when all of them are there."""
+        if self.local is not None:
+            generations = [self.local.get(generation_key) for generation_key in generation_keys]
+            if None not in generations:
+                return generations
+        generations = await self.redis.mget(generation_keys)
+        if self.local is not None:
+            for generation_key, generation in zip(generation_keys, generations, strict=True):
+                if generation is not None:
+                    self.local.set(generation_key, generation)
+        return generations
+
+    async def _build(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[bytes]],
+        stale_name: str | None = None,
+        family: str | None = None,
+    ) -> bytes:
+        """Build value, with lock enabled only one instance in cluster builds it."""
+        if not settings.CACHE_LOCK_ENABLED:
+            return await self._build_and_set(key, factory, stale_name=stale_name, family=family)
+        lock = self.redis.lock(f'lock_{key}', timeout=settings.CACHE_LOCK_TIMEOUT_IN_SECONDS)
+        if not await lock.acquire(blocking=False):
+            cached_value = await self._wait_for(key)
+            if cached_value is not None:
+                return cached_value
+        try:
+            return await self._build_and_set(key, factory, stale_name=stale_name, family=family)
+        finally:
+            with contextlib.suppress(LockError):
+                await lock.release()
+
+    async def _build_and_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[bytes]],
+        stale_name: str | None = None,
+        family: str | None = None,
+    ) -> bytes:
+        """Build value and set it, not found result is cached for short time."""
+        try:
+            value = await factory()
+        except HTTPException as error:
+            if error.status_code != status.HTTP_404_NOT_FOUND or not settings.CACHE_NOT_FOUND_TTL_IN_SECONDS:
+                raise
+            value = NOT_FOUND_MARKER + str(error.detail).encode()
+            await self.set_many({key: value}, ttl=settings.CACHE_NOT_FOUND_TTL_IN_SECONDS)
+            return value
+        await self.set(key, value, stale_name=stale_name, family=family)
+        return value
+
+    async def _wait_for(self, key: str) -> bytes | None:
+        """Wait for value built by other instance."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.CACHE_LOCK_TIMEOUT_IN_SECONDS
+        while loop.time() < deadline:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL_IN_SECONDS)
+            value = await self.get(key)
+            if value is not None:
+                return value
+        return None
+
+    def invalidate_later(self, namespace: str, *namespaces: str) -> None:
+        """Collect namespaces for invalidation, they are flushed after response or by explicit flush."""
+        if not self.pending_namespaces and self.background_tasks is not None:
+            self.background_tasks.add_task(self.flush)
+        self.pending_namespaces.update((namespace, *namespaces))
+
+    async def flush(self) -> None:
+        """Invalidate all collected namespaces in one round trip."""
+        if not self.pending_namespaces:
+            return
+        namespaces, self.pending_namespaces = self.pending_namespaces, set()
+        await self.invalidate(*sorted(namespaces))
+
+    async def invalidate(self, namespace: str, *namespaces: str) -> None:
+        """Invalidate namespaces by new generation, old values expire by ttl."""
+        generation_keys = [get_generation_key(name) for name in (namespace, *namespaces)]
+        for name in (namespace, *namespaces):
+            for family in get_namespace_families(name):
+                cache_stats[family].invalidations += 1
+        if self.local is not None:
+            self.local.evict(*generation_keys)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            script = self.redis.register_script(SET_GENERATIONS_SCRIPT)
+            await script(
+                keys=[GENERATION_CLOCK_KEY, *generation_keys],
+                args=[get_generation_ttl(), 'SET'],
+                client=pipe,
+            )
+            if settings.DB_REPLICA_URLS:
+                # body built from lagging replica must not be cached for new generations
+                pipe.set(RECENT_WRITE_KEY, 1, px=get_recent_write_ttl())
+            pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, get_invalidation_message(*generation_keys))
+            await pipe.execute()
+
+    async def clear(self, key: str, *keys: str) -> None:
+        """Delete keys, then notify other instances."""
+        if self.local is not None:
+            self.local.evict(key, *keys)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key, *keys)
+            pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, get_invalidation_message(key, *keys))
+            await pipe.execute()
 
 
-def get_cache(redis: Annotated[Redis, Depends(get_redis_connection)]):
-    return Cache(redis=redis)
+def get_cache(redis: Annotated[Redis, Depends(get_redis_connection)], background_tasks: BackgroundTasks):
+    return Cache(redis=redis, local=local_cache, background_tasks=background_tasks)
@@ -0,0 +1,81 @@
+import functools
+import json
+import uuid
+import zlib
+from decimal import Decimal
+from typing import Any
+
+import orjson
+import zstandard
+from pydantic import BaseModel, TypeAdapter
+
+from src.config import settings
+
+# compressed payloads start with marker, json bodies never start with 0xff
+COMPRESSED_MARKER = b'\xff'
+ZLIB = b'z'
+ZSTD = b's'
+
+
+def encode_pydantic(adapter: TypeAdapter, value: Any) -> bytes:
+    """Serialize with pydantic core."""
+    return adapter.dump_json(value)
+
+
+@functools.cache
+def get_dumped_fields(model: type[BaseModel]) -> tuple[str, ...]:
+    """Fields of model in json, excluded fields are skipped."""
+    return tuple(name for name, field in model.model_fields.items() if not field.exclude)
+
+
+def to_json_compatible(value: Any) -> Any:
+    """Default hook of json encoders, models are given by fields and nested values are left to encoder.
+
+    Values are the same as pydantic json gives for them.
+    """
+    if isinstance(value, BaseModel):
+        return {name: getattr(value, name) for name in get_dumped_fields(type(value))}
+    if isinstance(value, Decimal | uuid.UUID):
+        return str(value)
+    raise TypeError(f'Type {type(value).__name__} is not serializable')
+
+
+def encode_orjson(adapter: TypeAdapter, value: Any) -> bytes:
+    """Serialize with orjson, models are walked once by encoder."""
+    return orjson.dumps(value, default=to_json_compatible)
+
+
+def encode_json(adapter: TypeAdapter, value: Any) -> bytes:
+    """Serialize with stdlib json, models are walked once by encoder."""
+    return json.dumps(value, default=to_json_compatible, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+ENCODERS = {
+    'pydantic': encode_pydantic,
+    'orjson': encode_orjson,
+    'json': encode_json,
+}
+
+
+def encode(adapter: TypeAdapter, value: Any) -> bytes:
+    """Serialize value to response body with configured encoder."""
+    return ENCODERS[settings.CACHE_ENCODER](adapter, value)
+
+
+def compress(value: bytes) -> bytes:
+    """Compress payload bigger than threshold with configured algorithm."""
+    if settings.CACHE_COMPRESSION == 'none' or len(value) < settings.CACHE_COMPRESSION_THRESHOLD_IN_BYTES:
+        return value
+    if settings.CACHE_COMPRESSION == 'zstd':
+        return COMPRESSED_MARKER + ZSTD + zstandard.compress(value, settings.CACHE_COMPRESSION_LEVEL)
+    return COMPRESSED_MARKER + ZLIB + zlib.compress(value, settings.CACHE_COMPRESSION_LEVEL)
+
+
+def decompress(value: bytes) -> bytes:
+    """Decompress payload, algorithm is taken from payload header."""
+    if not value.startswith(COMPRESSED_MARKER):
+        return value
+    algorithm, payload = value[1:2], value[2:]
+    if algorithm == ZSTD:
+        return zstandard.decompress(payload)
+    return zlib.decompress(payload)
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import logging
+
+from aioredis import Redis
+from aioredis.exceptions import ConnectionError
+from cachetools import TTLCache
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_IN_SECONDS = 1
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with TTL, used in front of redis."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.data: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> bytes | None:
+        """Get value and count hit or miss."""
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        """Set value."""
+        self.data[key] = value
+
+    def evict(self, *keys: str) -> None:
+        """Evict keys."""
+        for key in keys:
+            self.data.pop(key, None)
+
+    def clear(self) -> None:
+        """Evict all keys."""
+        self.data.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        """Part of reads served from memory."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict[str, int | float]:
+        """Counters for sizing the cache."""
+        return {
+            'size': len(self.data),
+            'maxsize': int(self.data.maxsize),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hit_ratio,
+        }
+
+
+def get_invalidation_message(*keys: str) -> str:
+    """Message for other instances about cleared keys."""
+    return json.dumps(keys)
+
+
+async def listen_invalidations(redis: Redis, local_cache: LocalCache) -> None:
+    """Evict keys cleared by any instance of application."""
+    while True:
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            # messages sent while we were not subscribed are lost
+            local_cache.clear()
+            async for message in pubsub.listen():
+                local_cache.evict(*json.loads(message['data']))
+        except ConnectionError:
+            logger.warning('Lost connection to cache invalidation channel, reconnecting')
+            await asyncio.sleep(RECONNECT_DELAY_IN_SECONDS)
+        finally:
+            await pubsub.close()
+
+
+local_cache = (
+    LocalCache(maxsize=settings.CACHE_LOCAL_MAXSIZE, ttl=settings.CACHE_LOCAL_TTL_IN_SECONDS)
+    if settings.CACHE_LOCAL_ENABLED else None
+)
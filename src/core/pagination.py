@@ -0,0 +1,48 @@
+import base64
+import binascii
+import uuid
+from dataclasses import dataclass
+from typing import Annotated, Generic, TypeVar
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+from src.config import settings
+
+T_Schema = TypeVar('T_Schema')
+
+
+@dataclass(frozen=True)
+class PageParams:
+    """Requested page of list ordered by id, after is id of last object of previous page."""
+    limit: int
+    after: str | None = None
+
+
+class Page(BaseModel, Generic[T_Schema]):
+    """Page of list, cursor of next page is None on last page."""
+    items: list[T_Schema]
+    next_cursor: str | None = None
+
+
+def encode_cursor(last_id: uuid.UUID | str) -> str:
+    """Opaque cursor of page after object."""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    """Id of last object of previous page."""
+    try:
+        return str(uuid.UUID(base64.urlsafe_b64decode(cursor.encode()).decode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='invalid cursor') from error
+
+
+def get_page_params(
+    limit: Annotated[int | None, Query(ge=1, le=settings.PAGE_MAX_LIMIT)] = None,
+    cursor: str | None = None,
+) -> PageParams | None:
+    """Requested page, whole list is returned without limit and cursor."""
+    if limit is None and cursor is None:
+        return None
+    return PageParams(limit=limit or settings.PAGE_DEFAULT_LIMIT, after=decode_cursor(cursor) if cursor else None)
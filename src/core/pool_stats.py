@@ -0,0 +1,116 @@
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from aioredis import BlockingConnectionPool, ConnectionPool
+from aioredis.connection import Connection
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+# name, help and field of pool metrics in prometheus format
+METRICS = (
+    ('pool_size', 'Connections kept in pool, max connections of redis.', 'size', 'gauge'),
+    ('pool_checked_out', 'Connections in use.', 'checked_out', 'gauge'),
+    ('pool_overflow', 'Connections opened over pool size.', 'overflow', 'gauge'),
+    ('pool_checkouts_total', 'Connections taken from pool.', 'checkouts', 'counter'),
+    ('pool_failures_total', 'Checkouts failed by timeout or connection error.', 'failures', 'counter'),
+    ('pool_wait_seconds_total', 'Time of waiting for connections, including connecting.', 'wait_seconds', 'counter'),
+    ('pool_max_wait_seconds', 'Longest wait for connection.', 'max_wait_seconds', 'gauge'),
+)
+
+
+@dataclass
+class PoolStats:
+    """Counters of checkouts of one pool, they are kept per process."""
+    checkouts: int = 0
+    failures: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def add(self, started: float, failed: bool = False) -> None:
+        """Count checkout started at perf counter value."""
+        wait = time.perf_counter() - started
+        self.checkouts += 1
+        self.failures += failed
+        self.wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool of async engine which counts time of waiting for connections."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.stats.add(started, failed=True)
+            raise
+        self.stats.add(started)
+        return connection
+
+
+class TimedBlockingConnectionPool(BlockingConnectionPool):
+    """Redis pool which waits for free connection over max connections and counts time of waiting."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self.in_use: set[Connection] = set()
+
+    async def get_connection(self, command_name: str, *keys: Any, **options: Any) -> Connection:
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except Exception:
+            self.stats.add(started, failed=True)
+            raise
+        self.stats.add(started)
+        self.in_use.add(connection)
+        return connection
+
+    async def release(self, connection: Connection) -> None:
+        self.in_use.discard(connection)
+        await super().release(connection)
+
+
+def get_db_pool_report(pool: Pool) -> dict:
+    """State of engine pool, pools without stats (e.g. NullPool of tests) have only class."""
+    if not isinstance(pool, TimedQueuePool):
+        return {'class': type(pool).__name__}
+    return {
+        'class': type(pool).__name__,
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        # overflow of pool is negative until pool size connections are opened
+        'overflow': max(pool.overflow(), 0),
+        **asdict(pool.stats),
+    }
+
+
+def get_redis_pool_report(pool: ConnectionPool) -> dict:
+    """State of redis pool."""
+    if not isinstance(pool, TimedBlockingConnectionPool):
+        return {'class': type(pool).__name__}
+    return {
+        'class': type(pool).__name__,
+        'size': pool.max_connections,
+        'checked_out': len(pool.in_use),
+        'overflow': 0,
+        **asdict(pool.stats),
+    }
+
+
+def pools_to_prometheus(reports: dict[str, dict]) -> str:
+    """Pool reports in prometheus text format, pools without stats are skipped."""
+    lines = []
+    for name, description, field, metric_type in METRICS:
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for pool, report in reports.items():
+            if field in report:
+                lines.append(f'{name}{{pool="{pool}"}} {report[field]}')
+    return '\n'.join(lines) + '\n'
@@ -1,17 +1,34 @@
 import uuid
-from typing import Generic, TypeVar
+from typing import Any, Generic, Protocol, TypeVar, cast
 
 from fastapi import HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import Select, delete, select, update
+from sqlalchemy import CursorResult, Select, delete, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import lazyload
+from typing_extensions import Self
 
-from src.database import Base
+from src.core.models import BaseUUIDDescriptionModel
+from src.core.pagination import Page, PageParams, encode_cursor
 
-T_Model = TypeVar('T_Model', bound=Base)
-T_Schema = TypeVar('T_Schema', bound=BaseModel)
+
+class SchemaWithId(Protocol):
+    """Schema of objects read from db, cursors of pages point to their ids."""
+    id: uuid.UUID | str
+
+    @classmethod
+    def model_validate(cls, obj: Any) -> Self:
+        ...
+
+
+T_Model = TypeVar('T_Model', bound=BaseUUIDDescriptionModel)
+T_Schema = TypeVar('T_Schema', bound=SchemaWithId)
 T_InputSchema = TypeVar('T_InputSchema', bound=BaseModel)
 
+UNIQUE_VIOLATION = '23505'
+FOREIGN_KEY_VIOLATION = '23503'
+
 
 class BaseRepository(Generic[T_Model, T_Schema, T_InputSchema]):
     """Base class for working with db."""
@@ -25,10 +42,7 @@ class BaseRepository(Generic[T_Model, T_Schema, T_InputSchema]):
         """Return object or 404 if object not exists."""
         obj = await self.get_all(**filters)
         if not obj:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f'{self.model.__name__.lower()} not found',
-            )
+            raise self.not_found_exception
         return obj[0]
 
     async def get_all(self, **filters: uuid.UUID | str) -> list[T_Schema]:
@@ -38,6 +52,17 @@ class BaseRepository(Generic[T_Model, T_Schema, T_InputSchema]):
         results = objects.all()
         return [self.get_schema.model_validate(result) for result in results]
 
+    # quoted, pydantic can not build schema of page parametrized by protocol bound type var
+    async def get_page(self, page: PageParams, **filters: uuid.UUID | str) -> 'Page[T_Schema]':
+        """Get objects of page by filters, one extra row tells that next page exists."""
+        query = (await self.get_query(**filters)).order_by(self.model.id).limit(page.limit + 1)
+        if page.after:
+            query = query.where(self.model.id > page.after)
+        results = (await self.session.execute(query)).all()
+        items = [self.get_schema.model_validate(result) for result in results[:page.limit]]
+        next_cursor = encode_cursor(items[-1].id) if len(results) > page.limit else None
+        return Page(items=items, next_cursor=next_cursor)
+
     async def get_query(self, **filters: uuid.UUID | str) -> Select:
         """Get query."""
         return select(self.model).filter_by(**filters)
@@ -47,28 +72,78 @@ class BaseRepository(Generic[T_Model, T_Schema, T_InputSchema]):
         return await self.perform_create(data, **kwargs)
 
     async def perform_create(self, data: T_InputSchema, **kwargs: uuid.UUID | str) -> T_Model:
-        """Perform create object."""
+        """Perform create object, constraints of db are checked by the insert itself."""
         obj = self.model(**data.model_dump(), **kwargs)
         self.session.add(obj)
-        await self.session.commit()
+        await self.commit_or_raise(data)
         return obj
 
     async def update(self, data: T_InputSchema, **filters: uuid.UUID | str) -> T_Model:
         """Update object."""
-        await self.get_object_or_404(**filters)
         query = (
             update(self.model)
             .values(**data.model_dump())
             .returning(self.model)
             .filter_by(**filters)
+            # eager relationships are not part of the response, skip their selects
+            .options(lazyload('*'))
         )
-        obj = await self.session.execute(query)
+        try:
+            obj = (await self.session.execute(query)).scalars().one_or_none()
+        except IntegrityError as error:
+            await self.session.rollback()
+            raise self.get_integrity_exception(error, data) from error
+        if obj is None:
+            raise self.not_found_exception
         await self.session.commit()
-        return obj.scalars().one()
+        return obj
 
     async def delete(self, **filters: uuid.UUID | str) -> None:
         """Delete object."""
-        await self.get_object_or_404(**filters)
         query = delete(self.model).filter_by(**filters)
-        await self.session.execute(query)
+        result = cast(CursorResult, await self.session.execute(query))
+        if not result.rowcount:
+            raise self.not_found_exception
         await self.session.commit()
+
+    async def commit_or_raise(self, data: T_InputSchema) -> None:
+        """Commit session, violated constraints are raised as http errors."""
+        try:
+            await self.session.commit()
+        except IntegrityError as error:
+            await self.session.rollback()
+            raise self.get_integrity_exception(error, data) from error
+
+    @property
+    def not_found_exception(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'{self.model.__name__.lower()} not found',
+        )
+
+    def get_integrity_exception(self, error: IntegrityError, data: T_InputSchema) -> Exception:
+        """403 for duplicated object, 404 for missing parent, other errors are raised as is."""
+        code = getattr(error.orig, 'sqlstate', None)
+        # primary keys are named by postgres default, ids are passed by clients such as admin sync
+        if code == UNIQUE_VIOLATION and get_constraint_name(error) == f'{self.model.__tablename__}_pkey':
+            return HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f'{self.model.__name__.lower()} with this id already exist',
+            )
+        if code == UNIQUE_VIOLATION:
+            return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=self.get_duplicate_detail(data))
+        if code == FOREIGN_KEY_VIOLATION:
+            return HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f'parent of {self.model.__name__.lower()} not found',
+            )
+        return error
+
+    def get_duplicate_detail(self, data: T_InputSchema) -> str:
+        return f'{self.model.__name__.lower()} already exist'
+
+
+def get_constraint_name(error: IntegrityError) -> str | None:
+    """Name of violated constraint, asyncpg error is the cause of dbapi error."""
+    cause = error.orig.__cause__ if error.orig is not None else None
+    return getattr(cause, 'constraint_name', None)
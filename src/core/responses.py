@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+
+from fastapi import Response, status
+
+
+class RawJSONResponse(Response):
+    """Response with body already serialized to json."""
+    media_type = 'application/json'
+
+
+@dataclass
+class CachedBody:
+    """Cached response body with its etag, body is None when client copy is actual."""
+    etag: str | None = None
+    body: bytes | None = None
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """Weak comparison of etag with If-None-Match header."""
+    return etag in {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+
+
+def cached_response(cached: CachedBody) -> Response:
+    """Response with etag, 304 when client copy is actual."""
+    headers = {'ETag': cached.etag} if cached.etag else None
+    if cached.body is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return RawJSONResponse(cached.body, headers=headers)
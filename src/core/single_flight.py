@@ -0,0 +1,27 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+class SingleFlight:
+    """Run only one coroutine per key, concurrent callers await its result."""
+
+    def __init__(self) -> None:
+        self.calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func or join the call already running for key."""
+        call = self.calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(func())
+            self.calls[key] = call
+            call.add_done_callback(lambda done: self._forget(key, done))
+        # cancelled caller must not cancel the call for other callers
+        return await asyncio.shield(call)
+
+    def _forget(self, key: str, call: asyncio.Future) -> None:
+        if self.calls.get(key) is call:
+            del self.calls[key]
+
+
+single_flight = SingleFlight()
@@ -1,19 +1,154 @@
+import asyncio
+import itertools
+import logging
+import time
+import uuid
 from collections.abc import AsyncGenerator
 
-from sqlalchemy.ext import asyncio
+from aioredis import Redis
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
 
 from src.config import settings
+from src.core.pool_stats import TimedQueuePool
+from src.redis_conf import redis
 
-engine = asyncio.create_async_engine(settings.db_url)
-async_session_maker = asyncio.async_sessionmaker(engine, expire_on_commit=False)
+logger = logging.getLogger(__name__)
+
+
+def get_engine_options() -> dict:
+    """Pool options of engines from settings."""
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT_IN_SECONDS,
+        'pool_recycle': settings.DB_POOL_RECYCLE_IN_SECONDS,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_PGBOUNCER:
+        # statements of one session run on different server connections,
+        # names of prepared statements must be unique and they must not be reused
+        options['connect_args'] = {
+            'statement_cache_size': 0,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4()}__',
+        }
+    return options
+
+
+engine = create_async_engine(settings.db_url, **get_engine_options())
+async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+READ_METHODS = frozenset({'GET', 'HEAD'})
+# reads of all processes go to primary while key lives, cache sets it with new generations
+RECENT_WRITE_KEY = 'db_recent_write'
+# primary and replica which replayed all received wal have no lag
+REPLICA_LAG_QUERY = text(
+    'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END',
+)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-async def get_async_session() -> AsyncGenerator[asyncio.AsyncSession, None]:
-    """Create async session."""
+class ReplicaRouter:
+    """Engine for reads: healthy replicas in turn, primary when replicas are down, lagging or just after write."""
+
+    def __init__(self, primary: AsyncEngine, replicas: list[AsyncEngine], redis: Redis | None = None):
+        self.primary = primary
+        self.replicas = replicas
+        self.redis = redis
+        self.healthy: list[AsyncEngine] = []
+        self.checked_at = float('-inf')
+        # writes of this process are read from primary until replicas may have replayed them
+        self.written_at = float('-inf')
+        self._turn = itertools.count()
+        self._lock = asyncio.Lock()
+
+    async def mark_write(self) -> None:
+        """Read from primary in all processes until replicas may have replayed writes."""
+        self.written_at = time.monotonic()
+        if self.redis is not None:
+            await self.redis.set(RECENT_WRITE_KEY, 1, px=get_recent_write_ttl())
+
+    async def was_written(self) -> bool:
+        """Check writes of this process, then writes of other processes and celery sync."""
+        if time.monotonic() - self.written_at < settings.DB_REPLICA_MAX_LAG_IN_SECONDS:
+            return True
+        return self.redis is not None and bool(await self.redis.exists(RECENT_WRITE_KEY))
+
+    async def get_read_engine(self) -> AsyncEngine:
+        if not self.replicas or await self.was_written():
+            return self.primary
+        await self.check()
+        if not self.healthy:
+            return self.primary
+        return self.healthy[next(self._turn) % len(self.healthy)]
+
+    async def check(self) -> None:
+        """Refresh healthy replicas once per check interval."""
+        if time.monotonic() - self.checked_at < settings.DB_REPLICA_CHECK_INTERVAL_IN_SECONDS:
+            return
+        async with self._lock:
+            if time.monotonic() - self.checked_at < settings.DB_REPLICA_CHECK_INTERVAL_IN_SECONDS:
+                return
+            statuses = await asyncio.gather(*[self.is_healthy(replica) for replica in self.replicas])
+            self.healthy = [replica for replica, healthy in zip(self.replicas, statuses, strict=True) if healthy]
+            self.checked_at = time.monotonic()
+
+    @staticmethod
+    async def is_healthy(replica: AsyncEngine) -> bool:
+        try:
+            lag = await asyncio.wait_for(get_lag(replica), settings.DB_REPLICA_CHECK_TIMEOUT_IN_SECONDS)
+        except (asyncio.TimeoutError, OSError, SQLAlchemyError):
+            logger.warning('Replica %s is down', replica.url.render_as_string())
+            return False
+        if lag is None or lag > settings.DB_REPLICA_MAX_LAG_IN_SECONDS:
+            logger.warning('Replica %s lags %s s', replica.url.render_as_string(), lag)
+            return False
+        return True
+
+
+def get_recent_write_ttl() -> int:
+    """Milliseconds reads go to primary after write."""
+    return max(int(settings.DB_REPLICA_MAX_LAG_IN_SECONDS * 1000), 1)
+
+
+async def get_lag(replica: AsyncEngine) -> float | None:
+    """Seconds replica is behind primary, None when replica has not replayed anything."""
+    async with replica.connect() as connection:
+        return await connection.scalar(REPLICA_LAG_QUERY)
+
+
+replica_router = ReplicaRouter(
+    primary=engine,
+    replicas=[create_async_engine(url, **get_engine_options()) for url in settings.DB_REPLICA_URLS],
+    redis=redis,
+)
+
+
+async def get_async_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Create async session, reads of GET requests go to replica.
+
+    Window of write is opened before session is given, code after yield runs after response is sent.
+    """
+    if request.method in READ_METHODS:
+        async with async_session_maker(bind=await replica_router.get_read_engine()) as session:
+            yield session
+        return
+    await replica_router.mark_write()
     async with async_session_maker() as session:
         yield session
+    # requests longer than max lag have outlived window opened before them
+    await replica_router.mark_write()
@@ -1,4 +1,4 @@
-from sqlalchemy import UUID, Column, ForeignKey, Numeric, String
+from sqlalchemy import DDL, UUID, Column, ForeignKey, Numeric, String, event
 from sqlalchemy.orm import relationship
 
 from src.config import settings
@@ -20,3 +20,34 @@ class Dish(BaseUUIDDescriptionModel):
     discount = Column(Numeric(precision=5, scale=2), default=settings.DEFAULT_DISCOUNT)
 
     submenu = relationship('SubMenu', back_populates='dishes')
+
+
+# counters of submenus and menus, they are updated in transaction of dishes change
+COUNT_DISHES_FUNCTION = """
+CREATE OR REPLACE FUNCTION count_dishes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.submenu_id IS NOT DISTINCT FROM NEW.submenu_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE submenus SET dishes_count = dishes_count - 1 WHERE id = OLD.submenu_id;
+        UPDATE menus SET dishes_count = menus.dishes_count - 1
+        FROM submenus WHERE submenus.id = OLD.submenu_id AND menus.id = submenus.menu_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE submenus SET dishes_count = dishes_count + 1 WHERE id = NEW.submenu_id;
+        UPDATE menus SET dishes_count = menus.dishes_count + 1
+        FROM submenus WHERE submenus.id = NEW.submenu_id AND menus.id = submenus.menu_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+COUNT_DISHES_TRIGGER = """
+CREATE TRIGGER count_dishes AFTER INSERT OR DELETE OR UPDATE OF submenu_id ON dishes
+FOR EACH ROW EXECUTE FUNCTION count_dishes()
+"""
+
+event.listen(Dish.__table__, 'after_create', DDL(COUNT_DISHES_FUNCTION))
+event.listen(Dish.__table__, 'after_create', DDL(COUNT_DISHES_TRIGGER))
+event.listen(Dish.__table__, 'after_drop', DDL('DROP FUNCTION IF EXISTS count_dishes'))
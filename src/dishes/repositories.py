@@ -1,16 +1,30 @@
 import uuid
+from decimal import Decimal
 from typing import Annotated
 
 from fastapi import Depends
-from sqlalchemy import Select, select
+from sqlalchemy import Select, Text, case, cast, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
 
+from src.config import settings
 from src.core.repositories import BaseRepository
 from src.database import get_async_session
 from src.dishes import models
 from src.dishes.schemas import CreateDish, Dish
 
 
+def get_price_with_discount() -> ColumnElement:
+    """Price for customer as text, same as DishBaseModel.check_price gives."""
+    cents = models.Dish.price * (1 - func.coalesce(models.Dish.discount, settings.DEFAULT_DISCOUNT)) * 100
+    rounded = case(
+        # half to even as decimal formatting of python does
+        (func.abs(cents - func.trunc(cents)) == Decimal('0.5'), func.trunc(cents) + func.trunc(cents) % 2),
+        else_=func.round(cents),
+    )
+    return cast(func.round(rounded / 100, 2), Text)
+
+
 class DishRepository(BaseRepository[models.Dish, Dish, CreateDish]):
     """Working with db for model Dish."""
 
@@ -1,8 +1,10 @@
 import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Response, status
 
+from src.core.pagination import Page, PageParams, get_page_params
+from src.core.responses import cached_response
 from src.dishes import schemas
 from src.dishes.services import DishService, get_dish_service
 
@@ -12,14 +14,18 @@ router = APIRouter(
 )
 
 
-@router.get('/', response_model=list[schemas.Dish], status_code=status.HTTP_200_OK)
+@router.get('/', response_model=list[schemas.Dish] | Page[schemas.Dish], status_code=status.HTTP_200_OK)
 async def get_dishes(
     menu_id: uuid.UUID,
     submenu_id: uuid.UUID,
     dishes: Annotated[DishService, Depends(get_dish_service)],
-) -> list[schemas.Dish]:
-    """Get list of dishes."""
-    return await dishes.get_all(submenu_id=submenu_id, menu_id=menu_id)
+    page: Annotated[PageParams | None, Depends(get_page_params)],
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Get list of dishes, page of list with limit or cursor."""
+    return cached_response(
+        await dishes.get_all(submenu_id=submenu_id, menu_id=menu_id, if_none_match=if_none_match, page=page),
+    )
 
 
 @router.get('/{dish_id}', response_model=schemas.Dish, status_code=status.HTTP_200_OK)
@@ -28,9 +34,12 @@ async def get_dish(
     menu_id: uuid.UUID,
     submenu_id: uuid.UUID,
     dishes: Annotated[DishService, Depends(get_dish_service)],
-) -> schemas.Dish:
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
     """Get dish by id."""
-    return await dishes.get(dish_id=dish_id, submenu_id=submenu_id, menu_id=menu_id)
+    return cached_response(
+        await dishes.get(dish_id=dish_id, submenu_id=submenu_id, menu_id=menu_id, if_none_match=if_none_match),
+    )
 
 
 @router.post('/', response_model=schemas.CreateDishOutput, status_code=status.HTTP_201_CREATED)
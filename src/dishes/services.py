@@ -1,43 +1,75 @@
 import uuid
 from typing import Annotated
 
-from fastapi import BackgroundTasks, Depends
+from fastapi import Depends
+from pydantic import TypeAdapter
 
+from src.core.cache_keys import (
+    MENUS_NAMESPACE,
+    dish_key,
+    dishes_key,
+    menu_namespace,
+    submenu_namespace,
+)
 from src.core.cashe import Cache, get_cache
+from src.core.codecs import encode
+from src.core.pagination import Page, PageParams
+from src.core.responses import CachedBody
 from src.dishes import schemas
 from src.dishes.repositories import DishRepository, get_dish_repository
 
+dish_adapter = TypeAdapter(schemas.Dish)
+dishes_adapter = TypeAdapter(list[schemas.Dish])
+dishes_page_adapter = TypeAdapter(Page[schemas.Dish])
+
 
 class DishService:
     def __init__(
         self,
         repository: DishRepository,
         cache: Cache,
-        background_tasks: BackgroundTasks = BackgroundTasks(),
     ):
-        self.background_tasks = background_tasks
         self.repository = repository
         self.cache = cache
 
-    async def get(self, dish_id: uuid.UUID, submenu_id: uuid.UUID, menu_id: uuid.UUID) -> schemas.Dish:
+    async def get(
+        self,
+        dish_id: uuid.UUID,
+        submenu_id: uuid.UUID,
+        menu_id: uuid.UUID,
+        if_none_match: str | None = None,
+    ) -> CachedBody:
         """Get dish by filter."""
-        key = f'menu_{menu_id}_submenu_{submenu_id}_dish_{dish_id}'
-        dish_cache = await self.cache.get(key)
-        if dish_cache:
-            return schemas.Dish.model_validate(dish_cache)
+        return await self.cache.get_cached_body(
+            key=dish_key(menu_id, submenu_id, dish_id),
+            factory=lambda: self._get(dish_id=dish_id, submenu_id=submenu_id),
+            if_none_match=if_none_match,
+        )
+
+    async def _get(self, dish_id: uuid.UUID, submenu_id: uuid.UUID) -> bytes:
+        """Get dish from db."""
         dish = await self.repository.get_object_or_404(id=dish_id, submenu_id=submenu_id)
-        await self.cache.set(key, schemas.Dish.model_validate(dish))
-        return dish
+        return encode(dish_adapter, dish)
 
-    async def get_all(self, submenu_id: uuid.UUID, menu_id: uuid.UUID) -> list[schemas.Dish]:
-        """Get all dishes."""
-        key = f'menu_{menu_id}_submenu_{submenu_id}_dishes'
-        dishes_cache = await self.cache.get(key=key)
-        if dishes_cache:
-            return [schemas.Dish.model_validate(dish) for dish in dishes_cache]
-        dishes = await self.repository.get_all(submenu_id=submenu_id)
-        await self.cache.set(key=key, value=dishes)
-        return dishes
+    async def get_all(
+        self,
+        submenu_id: uuid.UUID,
+        menu_id: uuid.UUID,
+        if_none_match: str | None = None,
+        page: PageParams | None = None,
+    ) -> CachedBody:
+        """Get all dishes or page of dishes."""
+        return await self.cache.get_cached_body(
+            key=dishes_key(menu_id, submenu_id, page),
+            factory=lambda: self._get_all(submenu_id=submenu_id, page=page),
+            if_none_match=if_none_match,
+        )
+
+    async def _get_all(self, submenu_id: uuid.UUID, page: PageParams | None = None) -> bytes:
+        """Get all dishes or page of dishes from db."""
+        if page:
+            return encode(dishes_page_adapter, await self.repository.get_page(page, submenu_id=submenu_id))
+        return encode(dishes_adapter, await self.repository.get_all(submenu_id=submenu_id))
 
     async def create(
         self,
@@ -47,9 +79,12 @@ class DishService:
         **kwargs: uuid.UUID | str,
     ) -> schemas.CreateDishOutput:
         """Create dish."""
-        dish = await self.repository.create(data=data, submenu_id=submenu_id, **kwargs)
-        self.background_tasks.add_task(self._clear_cache_parents, menu_id=menu_id, submenu_id=submenu_id)
-        return schemas.CreateDishOutput.model_validate(dish)
+        dish = schemas.CreateDishOutput.model_validate(
+            await self.repository.create(data=data, submenu_id=submenu_id, **kwargs),
+        )
+        await self.cache.mark_existing(dish_key(menu_id, submenu_id, dish.id))
+        self.cache.invalidate_later(MENUS_NAMESPACE, menu_namespace(menu_id))
+        return dish
 
     async def update(
         self,
@@ -60,35 +95,18 @@ class DishService:
     ) -> schemas.CreateDishOutput:
         """Update dish."""
         dish = await self.repository.update(data=data, id=dish_id)
-        self.background_tasks.add_task(
-            self.cache.clear,
-            'menus_relations',
-            f'menu_{menu_id}_submenu_{submenu_id}_dishes',
-            f'menu_{menu_id}_submenu_{submenu_id}_dish_{dish_id}',
-        )
+        self.cache.invalidate_later(MENUS_NAMESPACE, submenu_namespace(menu_id, submenu_id))
         return schemas.CreateDishOutput.model_validate(dish)
 
     async def delete(self, menu_id: uuid.UUID, submenu_id: uuid.UUID, id: uuid.UUID) -> None:
         """Delete dish."""
         await self.repository.delete(id=id)
-        self.background_tasks.add_task(self.cache.clear, f'menu_{menu_id}_submenu_{submenu_id}_dish_{id}')
-        self.background_tasks.add_task(self._clear_cache_parents, menu_id=menu_id, submenu_id=submenu_id)
-
-    async def _clear_cache_parents(self, menu_id: uuid.UUID, submenu_id: uuid.UUID) -> None:
-        """Clear cache of parents."""
-        await self.cache.clear(
-            'menus',
-            'menus_relations',
-            f'menu_{menu_id}',
-            f'menu_{menu_id}_submenus',
-            f'menu_{menu_id}_submenu_{submenu_id}',
-            f'menu_{menu_id}_submenu_{submenu_id}_dishes',
-        )
+        # counters of menu and submenu changed, whole menu namespace is outdated
+        self.cache.invalidate_later(MENUS_NAMESPACE, menu_namespace(menu_id))
 
 
 async def get_dish_service(
-    background_tasks: BackgroundTasks,
     repository: Annotated[DishRepository, Depends(get_dish_repository)],
     cache: Annotated[Cache, Depends(get_cache)],
 ) -> DishService:
-    return DishService(repository=repository, cache=cache, background_tasks=background_tasks)
+    return DishService(repository=repository, cache=cache)
@@ -0,0 +1,58 @@
+from typing import Annotated
+
+from aioredis import Redis
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
+
+from src.admin.sync_stats import get_sync_stats
+from src.core.cache_report import get_memory_report
+from src.core.cache_stats import cache_stats
+from src.core.local_cache import local_cache
+from src.core.pool_stats import (
+    get_db_pool_report,
+    get_redis_pool_report,
+    pools_to_prometheus,
+)
+from src.database import engine, replica_router
+from src.redis_conf import get_redis_connection, redis
+
+router = APIRouter(prefix='/internal', tags=['Internal'], include_in_schema=False)
+
+
+@router.get('/cache/stats', status_code=status.HTTP_200_OK)
+async def get_cache_stats() -> dict:
+    """Get cache counters of this process per key family."""
+    return cache_stats.to_dict(local=local_cache)
+
+
+@router.get('/metrics', response_class=PlainTextResponse, status_code=status.HTTP_200_OK)
+async def get_metrics() -> str:
+    """Get cache counters and pools of this process in prometheus text format."""
+    return cache_stats.to_prometheus(local=local_cache) + pools_to_prometheus(get_pools_report())
+
+
+@router.get('/pools', status_code=status.HTTP_200_OK)
+async def get_pools() -> dict:
+    """Get connections and waits of postgres and redis pools of this process."""
+    return get_pools_report()
+
+
+@router.get('/cache/memory', status_code=status.HTTP_200_OK)
+async def get_cache_memory(redis: Annotated[Redis, Depends(get_redis_connection)]) -> dict:
+    """Get number of keys and memory per key family, scans whole redis."""
+    return await get_memory_report(redis)
+
+
+@router.get('/sync/stats', status_code=status.HTTP_200_OK)
+async def get_admin_sync_stats(redis: Annotated[Redis, Depends(get_redis_connection)]) -> dict:
+    """Get runs of admin sync of all workers: synced, skipped because source is unchanged and failed."""
+    return await get_sync_stats(redis)
+
+
+def get_pools_report() -> dict[str, dict]:
+    """Reports of pools of this process by name."""
+    reports = {'postgres': get_db_pool_report(engine.pool)}
+    for number, replica in enumerate(replica_router.replicas):
+        reports[f'postgres_replica_{number}'] = get_db_pool_report(replica.pool)
+    reports['redis'] = get_redis_pool_report(redis.connection_pool)
+    return reports
@@ -1,10 +1,35 @@
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator
+
 from fastapi import APIRouter, FastAPI
 
+from src.config import settings
+from src.core.local_cache import listen_invalidations, local_cache
 from src.dishes.routers import router as dish_router
+from src.internal.routers import router as internal_router
 from src.menus.routers import router as menu_router
+from src.redis_conf import redis
 from src.submenus.routers import router as submenu_router
+from src.warm_up import run_warm_up
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Warm up cache and run cache invalidation listener while application is alive."""
+    tasks = []
+    if settings.CACHE_WARM_UP_ENABLED:
+        tasks.append(asyncio.create_task(run_warm_up()))
+    if local_cache is not None:
+        tasks.append(asyncio.create_task(listen_invalidations(redis=redis, local_cache=local_cache)))
+    yield
+    for task in tasks:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
 
-app = FastAPI(title='Restaurant menu')
+app = FastAPI(title='Restaurant menu', lifespan=lifespan)
 
 main_router = APIRouter(prefix='/api/v1')
 main_router.include_router(menu_router)
@@ -12,3 +37,4 @@ main_router.include_router(submenu_router)
 main_router.include_router(dish_router)
 
 app.include_router(main_router)
+app.include_router(internal_router)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import relationship
 
 from src.core.models import BaseUUIDDescriptionModel
@@ -10,6 +10,9 @@ class Menu(BaseUUIDDescriptionModel):
     __mapper_args__ = {'confirm_deleted_rows': False}
 
     title = Column(String(length=128), unique=True, nullable=False)
+    # kept by triggers of submenus and dishes
+    submenus_count = Column(Integer, nullable=False, server_default='0')
+    dishes_count = Column(Integer, nullable=False, server_default='0')
 
     submenus = relationship(
         'SubMenu',
@@ -1,20 +1,27 @@
 import uuid
-from collections.abc import Sequence
+from collections.abc import AsyncIterator, Sequence
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
-from sqlalchemy import Row, Select, distinct, func, select
+from fastapi import Depends
+from sqlalchemy import Row, Select, Text, cast, func, literal_column, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
+from sqlalchemy.sql.elements import ColumnElement
 
 from src.core.repositories import BaseRepository
 from src.database import get_async_session
 from src.dishes.models import Dish
+from src.dishes.repositories import get_price_with_discount
 from src.menus import models
 from src.menus.schemas import Menu, MenuCreateInput
 from src.submenus.models import SubMenu
 
 
+def or_empty_array(array: ColumnElement) -> ColumnElement:
+    """Json array or empty array instead of null of missing relations."""
+    return func.coalesce(array, literal_column("'[]'::json"))
+
+
 class MenuRepository(BaseRepository[models.Menu, Menu, MenuCreateInput]):
     """Working with db for model Menu."""
 
@@ -23,19 +30,13 @@ class MenuRepository(BaseRepository[models.Menu, Menu, MenuCreateInput]):
 
     async def get_query(self, **filters: uuid.UUID | str) -> Select:
         """Query for get menus."""
-        return (
-            select(
-                self.model.id,
-                self.model.title,
-                self.model.description,
-                func.count(distinct(SubMenu.id)).label('submenus_count'),
-                func.count(distinct(Dish.id)).label('dishes_count'),
-            )
-            .filter_by(**filters)
-            .outerjoin(SubMenu, self.model.id == SubMenu.menu_id)
-            .outerjoin(Dish, SubMenu.id == Dish.submenu_id)
-            .group_by(self.model.id)
-        )
+        return select(
+            self.model.id,
+            self.model.title,
+            self.model.description,
+            self.model.submenus_count,
+            self.model.dishes_count,
+        ).filter_by(**filters)
 
     async def get_with_relations(self) -> Sequence[Row[tuple[models.Menu]]]:
         """Return model with relations."""
@@ -43,19 +44,64 @@ class MenuRepository(BaseRepository[models.Menu, Menu, MenuCreateInput]):
         objects = await self.session.execute(query)
         return objects.unique().all()
 
-    async def create(
-        self,
-        data: MenuCreateInput,
-        **kwargs: uuid.UUID | str,
-    ) -> models.Menu:
-        """Create menu."""
-        menu = await self.get_all(title=data.title)
-        if menu:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f'Menu with title - {data.title}, already exist',
+    async def get_with_relations_json(self) -> bytes:
+        """Tree of menus with relations built by postgres as response body, keys in order of schemas."""
+        # each level is aggregated once with group by, correlated subqueries would scan dishes per submenu
+        dishes = select(
+            Dish.submenu_id,
+            func.json_agg(func.json_build_object(
+                'title', Dish.title,
+                'description', Dish.description,
+                'price', get_price_with_discount(),
+                'id', Dish.id,
+            )).label('dishes'),
+        ).group_by(Dish.submenu_id).subquery()
+        submenus = select(
+            SubMenu.menu_id,
+            func.json_agg(func.json_build_object(
+                'title', SubMenu.title,
+                'description', SubMenu.description,
+                'id', SubMenu.id,
+                'dishes', or_empty_array(dishes.c.dishes),
+            )).label('submenus'),
+        ).outerjoin(dishes, dishes.c.submenu_id == SubMenu.id).group_by(SubMenu.menu_id).subquery()
+        query = select(
+            cast(or_empty_array(func.json_agg(func.json_build_object(
+                'title', self.model.title,
+                'description', self.model.description,
+                'id', self.model.id,
+                'submenus', or_empty_array(submenus.c.submenus),
+            ))), Text),
+        ).outerjoin_from(self.model, submenus, submenus.c.menu_id == self.model.id)
+        body = (await self.session.execute(query)).scalar_one()
+        return body.encode()
+
+    async def stream_with_relations(self, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+        """Batches of rows of menus, submenus and dishes ordered by menu and submenu, read by server side cursor."""
+        query = (
+            select(
+                self.model.id,
+                self.model.title,
+                self.model.description,
+                SubMenu.id.label('submenu_id'),
+                SubMenu.title.label('submenu_title'),
+                SubMenu.description.label('submenu_description'),
+                Dish.id.label('dish_id'),
+                Dish.title.label('dish_title'),
+                Dish.description.label('dish_description'),
+                get_price_with_discount().label('price'),
             )
-        return await self.perform_create(data, **kwargs)
+            .outerjoin(SubMenu, SubMenu.menu_id == self.model.id)
+            .outerjoin(Dish, Dish.submenu_id == SubMenu.id)
+            .order_by(self.model.id, SubMenu.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream(query)
+        async for rows in result.partitions():
+            yield rows
+
+    def get_duplicate_detail(self, data: MenuCreateInput) -> str:
+        return f'Menu with title - {data.title}, already exist'
 
 
 async def get_menu_repository(session: Annotated[AsyncSession, Depends(get_async_session)]) -> MenuRepository:
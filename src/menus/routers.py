@@ -1,18 +1,26 @@
 import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Response, status
+from fastapi.responses import StreamingResponse
 
+from src.config import settings
+from src.core.pagination import Page, PageParams, get_page_params
+from src.core.responses import cached_response
 from src.menus import schemas
 from src.menus.services import MenuService, get_menu_service
 
 router = APIRouter(prefix='/menus', tags=['Menu'])
 
 
-@router.get('/', response_model=list[schemas.Menu], status_code=status.HTTP_200_OK)
-async def get_menus(menu: Annotated[MenuService, Depends(get_menu_service)]) -> list[schemas.Menu]:
-    """Get list of menus."""
-    return await menu.get_all()
+@router.get('/', response_model=list[schemas.Menu] | Page[schemas.Menu], status_code=status.HTTP_200_OK)
+async def get_menus(
+    menu: Annotated[MenuService, Depends(get_menu_service)],
+    page: Annotated[PageParams | None, Depends(get_page_params)],
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Get list of menus, page of list with limit or cursor."""
+    return cached_response(await menu.get_all(if_none_match=if_none_match, page=page))
 
 
 @router.get(
@@ -20,9 +28,13 @@ async def get_menus(menu: Annotated[MenuService, Depends(get_menu_service)]) ->
     response_model=schemas.Menu,
     status_code=status.HTTP_200_OK,
 )
-async def get_menu(menu_id: uuid.UUID, menu: Annotated[MenuService, Depends(get_menu_service)]) -> schemas.Menu:
+async def get_menu(
+    menu_id: uuid.UUID,
+    menu: Annotated[MenuService, Depends(get_menu_service)],
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
     """Get meny by id."""
-    return await menu.get(id=menu_id)
+    return cached_response(await menu.get(id=menu_id, if_none_match=if_none_match))
 
 
 @router.get(
@@ -32,9 +44,14 @@ async def get_menu(menu_id: uuid.UUID, menu: Annotated[MenuService, Depends(get_
 )
 async def get_menu_with_relations(
         menu: Annotated[MenuService, Depends(get_menu_service)],
-) -> list[schemas.MenuWithRelations]:
-    """Get meny with relations."""
-    return await menu.get_with_relations()
+        if_none_match: Annotated[str | None, Header()] = None,
+        engine: schemas.RelationsEngine | None = None,
+) -> Response:
+    """Get meny with relations, engine overrides RELATIONS_ENGINE setting, stream is not cached."""
+    engine = engine or settings.RELATIONS_ENGINE
+    if engine == 'stream':
+        return StreamingResponse(menu.stream_with_relations(), media_type='application/json')
+    return cached_response(await menu.get_with_relations(if_none_match=if_none_match, engine=engine))
 
 
 @router.post(
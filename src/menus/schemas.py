@@ -1,8 +1,11 @@
 import uuid
+from typing import Literal
 
 from src.core.schemas import BaseSchema
 from src.submenus.schemas import SubmenuWithRelations
 
+RelationsEngine = Literal['orm', 'json', 'stream']
+
 
 class Menu(BaseSchema):
     """Menu schema."""
@@ -1,12 +1,75 @@
 import uuid
+from collections.abc import AsyncIterator, Sequence
 from typing import Annotated
 
-from fastapi import BackgroundTasks, Depends
+import orjson
+from fastapi import Depends
+from pydantic import TypeAdapter
+from sqlalchemy import Row
 
+from src.config import settings
+from src.core.cache_keys import (
+    MENUS_NAMESPACE,
+    menu_key,
+    menu_namespace,
+    menus_key,
+    relations_key,
+)
 from src.core.cashe import Cache, get_cache
+from src.core.codecs import encode
+from src.core.pagination import Page, PageParams
+from src.core.responses import CachedBody
 from src.menus import schemas
 from src.menus.repositories import MenuRepository, get_menu_repository
 
+menu_adapter = TypeAdapter(schemas.Menu)
+menus_adapter = TypeAdapter(list[schemas.Menu])
+menus_page_adapter = TypeAdapter(Page[schemas.Menu])
+menus_with_relations_adapter = TypeAdapter(list[schemas.MenuWithRelations])
+
+
+class RelationsJsonWriter:
+    """Json of menus with relations from batches of rows ordered by menu and submenu, keys in order of schemas."""
+
+    def __init__(self):
+        self.menu_id = None
+        self.submenu_id = None
+        self.first_dish = True
+
+    def write(self, rows: Sequence[Row]) -> bytearray:
+        """Json of rows, objects of last row stay open for next batch."""
+        chunk = bytearray()
+        for row in rows:
+            if row.id != self.menu_id:
+                chunk += self.close()
+                chunk += b',' * (self.menu_id is not None) + self.open_object(row.title, row.description, row.id)
+                chunk += b',"submenus":['
+                self.menu_id, self.submenu_id = row.id, None
+            if row.submenu_id not in (None, self.submenu_id):
+                chunk += b']},' * (self.submenu_id is not None)
+                chunk += self.open_object(row.submenu_title, row.submenu_description, row.submenu_id)
+                chunk += b',"dishes":['
+                self.submenu_id, self.first_dish = row.submenu_id, True
+            if row.dish_id is not None:
+                dish = orjson.dumps({
+                    'title': row.dish_title,
+                    'description': row.dish_description,
+                    'price': row.price,
+                    'id': row.dish_id,
+                })
+                chunk += b',' * (not self.first_dish) + dish
+                self.first_dish = False
+        return chunk
+
+    def close(self) -> bytes:
+        """Close dishes and submenus of current menu."""
+        return b']}' * ((self.submenu_id is not None) + (self.menu_id is not None))
+
+    @staticmethod
+    def open_object(title: str, description: str, id: str) -> bytes:
+        """Json object without closing brace."""
+        return orjson.dumps({'title': title, 'description': description, 'id': id})[:-1]
+
 
 class MenuService:
     """Service for Menu."""
@@ -15,65 +78,89 @@ class MenuService:
             self,
             repository: MenuRepository,
             cache: Cache,
-            background_tasks: BackgroundTasks = BackgroundTasks(),
     ):
         self.repository = repository
         self.cache = cache
-        self.background_tasks = background_tasks
-
-    async def get(self, **filters: uuid.UUID | str) -> schemas.Menu:
-        """Get menu with filters."""
-        key = f"menu_{filters.get('id')}"
-        menu_cache = await self.cache.get(key)
-        if menu_cache:
-            return schemas.Menu.model_validate(menu_cache)
-        menu = await self.repository.get_object_or_404(**filters)
-        await self.cache.set(key, menu)
-        return menu
 
-    async def get_all(self) -> list[schemas.Menu]:
-        """Get all menus."""
-        key = 'menus'
-        menus_cache = await self.cache.get(key=key)
-        if menus_cache:
-            return [schemas.Menu.model_validate(menu) for menu in menus_cache]
-        menus = await self.repository.get_all()
-        await self.cache.set(key=key, value=menus)
-        return menus
-
-    async def get_with_relations(self) -> list[schemas.MenuWithRelations]:
-        """Get menus with relations."""
-        key = 'menus_relations'
-        cache = await self.cache.get(key=key)
-        if cache:
-            return [schemas.MenuWithRelations.model_validate(menu) for menu in cache]
+    async def get(self, id: uuid.UUID | str, if_none_match: str | None = None) -> CachedBody:
+        """Get menu by id."""
+        return await self.cache.get_cached_body(
+            menu_key(id),
+            lambda: self._get(id=id),
+            if_none_match=if_none_match,
+        )
+
+    async def _get(self, id: uuid.UUID | str) -> bytes:
+        """Get menu from db."""
+        menu = await self.repository.get_object_or_404(id=id)
+        return encode(menu_adapter, menu)
+
+    async def get_all(self, if_none_match: str | None = None, page: PageParams | None = None) -> CachedBody:
+        """Get all menus or page of menus."""
+        return await self.cache.get_cached_body(
+            key=menus_key(page),
+            factory=lambda: self._get_all(page=page),
+            if_none_match=if_none_match,
+        )
+
+    async def _get_all(self, page: PageParams | None = None) -> bytes:
+        """Get all menus or page of menus from db."""
+        if page:
+            return encode(menus_page_adapter, await self.repository.get_page(page))
+        return encode(menus_adapter, await self.repository.get_all())
+
+    async def get_with_relations(
+        self,
+        if_none_match: str | None = None,
+        engine: schemas.RelationsEngine | None = None,
+    ) -> CachedBody:
+        """Get menus with relations, engine builds body on cache miss."""
+        engine = engine or settings.RELATIONS_ENGINE
+        return await self.cache.get_cached_body(
+            key=relations_key(),
+            factory=self.repository.get_with_relations_json if engine == 'json' else self._get_with_relations,
+            if_none_match=if_none_match,
+        )
+
+    async def stream_with_relations(self) -> AsyncIterator[bytes]:
+        """Json of menus with relations in chunks, memory does not grow with size of tree."""
+        writer = RelationsJsonWriter()
+        chunk = bytearray(b'[')
+        async for rows in self.repository.stream_with_relations(settings.RELATIONS_STREAM_BATCH_SIZE):
+            chunk += writer.write(rows)
+            if len(chunk) >= settings.RELATIONS_STREAM_CHUNK_SIZE_IN_BYTES:
+                yield bytes(chunk)
+                chunk.clear()
+        yield bytes(chunk + writer.close() + b']')
+
+    async def _get_with_relations(self) -> bytes:
+        """Get menus with relations from db."""
         menus = await self.repository.get_with_relations()
         menus_with_relations = [schemas.MenuWithRelations.model_validate(menu[0]) for menu in menus]
-        await self.cache.set(key=key, value=menus_with_relations)
-        return menus_with_relations
+        return encode(menus_with_relations_adapter, menus_with_relations)
 
     async def create(self, data: schemas.MenuCreateInput, **kwargs: uuid.UUID | str) -> schemas.MenuCreateOutput:
         """Create menu."""
-        menu = await self.repository.create(data=data, **kwargs)
-        self.background_tasks.add_task(self.cache.clear, 'menus', 'menus_relations')
-        return schemas.MenuCreateOutput.model_validate(menu)
+        menu = schemas.MenuCreateOutput.model_validate(await self.repository.create(data=data, **kwargs))
+        await self.cache.mark_existing(menu_key(menu.id))
+        # namespace of new id may hold cached not found result
+        self.cache.invalidate_later(MENUS_NAMESPACE, menu_namespace(menu.id))
+        return menu
 
     async def update(self, data: schemas.MenuCreateInput, menu_id: uuid.UUID | str) -> schemas.MenuCreateOutput:
         """Update menu."""
         menu = await self.repository.update(id=menu_id, data=data)
-        self.background_tasks.add_task(self.cache.clear, 'menus', 'menus_relations', f'menu_{menu_id}')
+        self.cache.invalidate_later(MENUS_NAMESPACE, menu_namespace(menu_id))
         return schemas.MenuCreateOutput.model_validate(menu)
 
     async def delete(self, id: uuid.UUID) -> None:
         """Delete menu."""
         await self.repository.delete(id=id)
-        self.background_tasks.add_task(self.cache.clear, 'menus', 'menus_relations')
-        self.background_tasks.add_task(self.cache.clear_by_mask, f'menu_{id}')
+        self.cache.invalidate_later(MENUS_NAMESPACE, menu_namespace(id))
 
 
 async def get_menu_service(
-    background_tasks: BackgroundTasks,
     repository: Annotated[MenuRepository, Depends(get_menu_repository)],
     cache: Annotated[Cache, Depends(get_cache)],
 ) -> MenuService:
-    return MenuService(repository=repository, cache=cache, background_tasks=background_tasks)
+    return MenuService(repository=repository, cache=cache)
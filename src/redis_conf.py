@@ -3,12 +3,17 @@ from collections.abc import AsyncIterator
 import aioredis
 
 from src.config import settings
+from src.core.pool_stats import TimedBlockingConnectionPool
 
-redis = aioredis.from_url(
-    settings.redis_url,
-    encoding='utf-8',
-    decode_responses=True,
-    password=settings.REDIS_PASS,
+redis = aioredis.Redis(
+    connection_pool=TimedBlockingConnectionPool.from_url(
+        settings.redis_url,
+        encoding='utf-8',
+        decode_responses=False,
+        password=settings.REDIS_PASS,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT_IN_SECONDS,
+    ),
 )
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import UUID, Column, ForeignKey, String
+from sqlalchemy import DDL, UUID, Column, ForeignKey, Integer, String, event
 from sqlalchemy.orm import relationship
 
 from src.core.models import BaseUUIDDescriptionModel
@@ -14,6 +14,8 @@ class SubMenu(BaseUUIDDescriptionModel):
         UUID(as_uuid=False),
         ForeignKey('menus.id', ondelete='CASCADE'),
     )
+    # kept by trigger of dishes
+    dishes_count = Column(Integer, nullable=False, server_default='0')
 
     menu = relationship('Menu', back_populates='submenus')
     dishes = relationship(
@@ -22,3 +24,34 @@ class SubMenu(BaseUUIDDescriptionModel):
         cascade='all, delete',
         lazy='subquery',
     )
+
+
+# counters of menus, dishes of deleted submenu are subtracted here, cascade can not find menu of them
+COUNT_SUBMENUS_FUNCTION = """
+CREATE OR REPLACE FUNCTION count_submenus() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.menu_id IS NOT DISTINCT FROM NEW.menu_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE menus
+        SET submenus_count = submenus_count - 1, dishes_count = dishes_count - OLD.dishes_count
+        WHERE id = OLD.menu_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE menus
+        SET submenus_count = submenus_count + 1, dishes_count = dishes_count + NEW.dishes_count
+        WHERE id = NEW.menu_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+COUNT_SUBMENUS_TRIGGER = """
+CREATE TRIGGER count_submenus AFTER INSERT OR DELETE OR UPDATE OF menu_id ON submenus
+FOR EACH ROW EXECUTE FUNCTION count_submenus()
+"""
+
+event.listen(SubMenu.__table__, 'after_create', DDL(COUNT_SUBMENUS_FUNCTION))
+event.listen(SubMenu.__table__, 'after_create', DDL(COUNT_SUBMENUS_TRIGGER))
+event.listen(SubMenu.__table__, 'after_drop', DDL('DROP FUNCTION IF EXISTS count_submenus'))
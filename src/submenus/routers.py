@@ -1,21 +1,25 @@
 import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Response, status
 
+from src.core.pagination import Page, PageParams, get_page_params
+from src.core.responses import cached_response
 from src.submenus import schemas
 from src.submenus.services import SubMenuService, get_submenu_service
 
 router = APIRouter(prefix='/menus/{menu_id}/submenus', tags=['SubMenu'])
 
 
-@router.get('/', response_model=list[schemas.SubMenu], status_code=status.HTTP_200_OK)
+@router.get('/', response_model=list[schemas.SubMenu] | Page[schemas.SubMenu], status_code=status.HTTP_200_OK)
 async def get_submenus(
     menu_id: uuid.UUID,
     submenu: Annotated[SubMenuService, Depends(get_submenu_service)],
-) -> list[schemas.SubMenu]:
-    """Get list of SubMenus."""
-    return await submenu.get_all(menu_id=menu_id)
+    page: Annotated[PageParams | None, Depends(get_page_params)],
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Get list of SubMenus, page of list with limit or cursor."""
+    return cached_response(await submenu.get_all(menu_id=menu_id, if_none_match=if_none_match, page=page))
 
 
 @router.get(
@@ -27,9 +31,10 @@ async def get_submenu(
     menu_id: uuid.UUID,
     submenu_id: uuid.UUID,
     submenu: Annotated[SubMenuService, Depends(get_submenu_service)],
-) -> schemas.SubMenu:
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
     """Get submenu by id."""
-    return await submenu.get(submenu_id=submenu_id, menu_id=menu_id)
+    return cached_response(await submenu.get(submenu_id=submenu_id, menu_id=menu_id, if_none_match=if_none_match))
 
 
 @router.post(
@@ -1,46 +1,72 @@
 import uuid
 from typing import Annotated
 
-from fastapi import BackgroundTasks, Depends
+from fastapi import Depends
+from pydantic import TypeAdapter
 
+from src.core.cache_keys import (
+    MENUS_NAMESPACE,
+    menu_namespace,
+    submenu_key,
+    submenus_key,
+)
 from src.core.cashe import Cache, get_cache
+from src.core.codecs import encode
+from src.core.pagination import Page, PageParams
+from src.core.responses import CachedBody
 from src.submenus import schemas
 from src.submenus.repositories import SubMenuRepository, get_submenu_repository
 
+submenu_adapter = TypeAdapter(schemas.SubMenu)
+submenus_adapter = TypeAdapter(list[schemas.SubMenu])
+submenus_page_adapter = TypeAdapter(Page[schemas.SubMenu])
+
 
 class SubMenuService:
     def __init__(
         self,
         repository: SubMenuRepository,
         cache: Cache,
-        background_tasks: BackgroundTasks = BackgroundTasks(),
     ):
-        self.background_tasks = background_tasks
         self.repository = repository
         self.cache = cache
 
-    async def get(self, menu_id: uuid.UUID, submenu_id: uuid.UUID) -> schemas.SubMenu:
+    async def get(
+        self,
+        menu_id: uuid.UUID,
+        submenu_id: uuid.UUID,
+        if_none_match: str | None = None,
+    ) -> CachedBody:
         """Get submenu by filter."""
-        key = f'menu_{menu_id}_submenu_{submenu_id}'
-        submenu_cache = await self.cache.get(key)
-        if submenu_cache:
-            return schemas.SubMenu.model_validate(submenu_cache)
-        submenu = await self.repository.get_object_or_404(
-            id=submenu_id,
-            menu_id=menu_id,
+        return await self.cache.get_cached_body(
+            submenu_key(menu_id, submenu_id),
+            lambda: self._get(menu_id=menu_id, submenu_id=submenu_id),
+            if_none_match=if_none_match,
+        )
+
+    async def _get(self, menu_id: uuid.UUID, submenu_id: uuid.UUID) -> bytes:
+        """Get submenu from db."""
+        submenu = await self.repository.get_object_or_404(id=submenu_id, menu_id=menu_id)
+        return encode(submenu_adapter, submenu)
+
+    async def get_all(
+        self,
+        menu_id: uuid.UUID,
+        if_none_match: str | None = None,
+        page: PageParams | None = None,
+    ) -> CachedBody:
+        """Get all submenus or page of submenus."""
+        return await self.cache.get_cached_body(
+            key=submenus_key(menu_id, page),
+            factory=lambda: self._get_all(menu_id=menu_id, page=page),
+            if_none_match=if_none_match,
         )
-        await self.cache.set(key, submenu)
-        return submenu
 
-    async def get_all(self, menu_id: uuid.UUID) -> list[schemas.SubMenu]:
-        """Get all submenus."""
-        key = f'menu_{menu_id}_submenus'
-        submenus_cache = await self.cache.get(key=key)
-        if submenus_cache:
-            return [schemas.SubMenu.model_validate(submenu) for submenu in submenus_cache]
-        submenus = await self.repository.get_all(menu_id=menu_id)
-        await self.cache.set(key=key, value=submenus)
-        return submenus
+    async def _get_all(self, menu_id: uuid.UUID, page: PageParams | None = None) -> bytes:
+        """Get all submenus or page of submenus from db."""
+        if page:
+            return encode(submenus_page_adapter, await self.repository.get_page(page, menu_id=menu_id))
+        return encode(submenus_adapter, await self.repository.get_all(menu_id=menu_id))
 
     async def create(
         self,
@@ -49,9 +75,12 @@ class SubMenuService:
         **kwargs: uuid.UUID | str,
     ) -> schemas.SubMenuCreationOutput:
         """Create submenu."""
-        submenu = await self.repository.create(data=data, menu_id=menu_id, **kwargs)
-        self.background_tasks.add_task(self._clear_cache_of_parents, menu_id=menu_id)
-        return schemas.SubMenuCreationOutput.model_validate(submenu)
+        submenu = schemas.SubMenuCreationOutput.model_validate(
+            await self.repository.create(data=data, menu_id=menu_id, **kwargs),
+        )
+        await self.cache.mark_existing(submenu_key(menu_id, submenu.id))
+        self.cache.invalidate_later(MENUS_NAMESPACE, menu_namespace(menu_id))
+        return submenu
 
     async def update(
         self,
@@ -59,33 +88,18 @@ class SubMenuService:
         submenu_id: uuid.UUID,
     ) -> schemas.SubMenuCreationOutput:
         """Update submenu."""
-        submenu = await self.repository.update(data=data, id=submenu_id)
-        self.background_tasks.add_task(
-            self.cache.clear,
-            'menus_relations',
-            f'menu_{submenu.menu_id}_submenus',
-            f'menu_{submenu.menu_id}_submenu_{submenu.id}',
-        )
-        return schemas.SubMenuCreationOutput.model_validate(submenu)
+        submenu = schemas.SubMenuCreationOutput.model_validate(await self.repository.update(data=data, id=submenu_id))
+        self.cache.invalidate_later(MENUS_NAMESPACE, menu_namespace(submenu.menu_id))
+        return submenu
 
     async def delete(self, menu_id: uuid.UUID, id: uuid.UUID) -> None:
         """Delete submenu."""
         await self.repository.delete(id=id)
-        self.background_tasks.add_task(self._clear_cache_of_parents, menu_id=menu_id)
-        self.background_tasks.add_task(self.cache.clear_by_mask, f'menu_{menu_id}_submenu_{id}')
-
-    async def _clear_cache_of_parents(self, menu_id: uuid.UUID) -> None:
-        await self.cache.clear(
-            'menus',
-            'menus_relations',
-            f'menu_{menu_id}',
-            f'menu_{menu_id}_submenus',
-        )
+        self.cache.invalidate_later(MENUS_NAMESPACE, menu_namespace(menu_id))
 
 
 async def get_submenu_service(
-    background_tasks: BackgroundTasks,
     repository: Annotated[SubMenuRepository, Depends(get_submenu_repository)],
     cache: Annotated[Cache, Depends(get_cache)],
 ) -> SubMenuService:
-    return SubMenuService(repository=repository, cache=cache, background_tasks=background_tasks)
+    return SubMenuService(repository=repository, cache=cache)
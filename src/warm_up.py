@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.core.cache_keys import (
+    MENUS_NAMESPACE,
+    CacheKey,
+    dishes_key,
+    get_key_namespaces,
+    menu_key,
+    menus_key,
+    relations_key,
+    submenus_key,
+)
+from src.core.cashe import Cache, get_bloom_filter
+from src.core.codecs import encode
+from src.core.local_cache import local_cache
+from src.database import async_session_maker
+from src.dishes.services import dishes_adapter
+from src.menus import models
+from src.menus.repositories import MenuRepository
+from src.menus.schemas import Menu, MenuWithRelations
+from src.menus.services import menu_adapter, menus_adapter, menus_with_relations_adapter
+from src.redis_conf import redis
+from src.submenus.schemas import SubMenu
+from src.submenus.services import submenus_adapter
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache_bodies(menus: list[models.Menu]) -> list[tuple[CacheKey, bytes]]:
+    """Bodies of menus, relations, each menu, submenu lists and dish lists, same as services build them."""
+    menus_with_relations = [MenuWithRelations.model_validate(menu) for menu in menus]
+    bodies = [(relations_key(), encode(menus_with_relations_adapter, menus_with_relations))]
+    menu_schemas = []
+    for menu in menus:
+        menu_schema = Menu.model_validate(menu)
+        submenu_schemas = []
+        for submenu in menu.submenus:
+            submenu_schema = SubMenu.model_validate(submenu)
+            submenu_schemas.append(submenu_schema)
+            # dishes of list are read without discount, as in DishRepository.get_query
+            dishes = dishes_adapter.validate_python([
+                {
+                    'id': dish.id,
+                    'title': dish.title,
+                    'description': dish.description,
+                    'submenu_id': dish.submenu_id,
+                    'price': dish.price,
+                } for dish in submenu.dishes
+            ])
+            bodies.append((dishes_key(menu_schema.id, submenu_schema.id), encode(dishes_adapter, dishes)))
+        menu_schemas.append(menu_schema)
+        bodies.append((menu_key(menu_schema.id), encode(menu_adapter, menu_schema)))
+        bodies.append((submenus_key(menu_schema.id), encode(submenus_adapter, submenu_schemas)))
+    bodies.append((menus_key(), encode(menus_adapter, menu_schemas)))
+    return bodies
+
+
+def get_existing_ids(menus: list[models.Menu]) -> dict[str, list[str]]:
+    """Ids of menus, submenus and dishes for filters of existing ids."""
+    submenus = [submenu for menu in menus for submenu in menu.submenus]
+    return {
+        'menu': [str(menu.id) for menu in menus],
+        'submenu': [str(submenu.id) for submenu in submenus],
+        'dish': [str(dish.id) for submenu in submenus for dish in submenu.dishes],
+    }
+
+
+async def warm_up_cache(session: AsyncSession, cache: Cache, concurrency: int, batch_size: int) -> int:
+    """Fill cache and filters of existing ids from one read of menu tree, return number of warmed keys."""
+    started = time.perf_counter()
+    rebuilds = {}
+    if settings.CACHE_BLOOM_ENABLED:
+        for family in ('menu', 'submenu', 'dish'):
+            bloom_filter = get_bloom_filter(cache.redis, family)
+            token = await bloom_filter.start_rebuild(settings.CACHE_BLOOM_REBUILD_TIMEOUT_IN_SECONDS)
+            # filter is rebuilt by warm up of other worker
+            if token is not None:
+                rebuilds[family] = (bloom_filter, token)
+    generation = (await cache.get_generations([MENUS_NAMESPACE]))[MENUS_NAMESPACE]
+    menus = [row[0] for row in await MenuRepository(session=session).get_with_relations()]
+    existing_ids = get_existing_ids(menus)
+    for family, (bloom_filter, token) in rebuilds.items():
+        if not await bloom_filter.finish_rebuild(token, existing_ids[family]):
+            logger.warning('Filter of existing %s ids is not replaced, lock of rebuild expired', family)
+    bodies = get_cache_bodies(menus)
+    keys = [key for key, _ in bodies]
+    # every write bumps generation of all menus in one transaction with generations of its namespaces,
+    # while it is unchanged other generations are the ones menus were read at
+    generations = await cache.get_generations(get_key_namespaces(keys))
+    if generations[MENUS_NAMESPACE] != generation:
+        logger.info('Cache warm up skipped, menus changed while reading')
+        return 0
+    # bodies are written for generations resolved once, writes during warm up leave them under old generations
+    redis_keys = await cache.resolve_many(keys, generations)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def set_bodies(start: int) -> None:
+        async with semaphore:
+            await cache.set_bodies(bodies[start:start + batch_size], redis_keys[start:start + batch_size])
+
+    await asyncio.gather(*[set_bodies(start) for start in range(0, len(bodies), batch_size)])
+    logger.info('Cache warmed up, %s keys in %.3f s', len(bodies), time.perf_counter() - started)
+    return len(bodies)
+
+
+async def run_warm_up() -> None:
+    """Warm up cache with own db session, failure only leaves cache cold."""
+    try:
+        async with async_session_maker() as session:
+            await warm_up_cache(
+                session,
+                Cache(redis=redis, local=local_cache),
+                concurrency=settings.CACHE_WARM_UP_CONCURRENCY,
+                batch_size=settings.CACHE_WARM_UP_BATCH_SIZE,
+            )
+    except Exception:
+        logger.exception('Cache warm up failed')
@@ -0,0 +1,306 @@
+import copy
+import functools
+import os
+from collections.abc import AsyncGenerator, Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import status
+from sqlalchemy import func, select
+
+from src import celery_conf
+from src.admin.models import SyncState
+from src.admin.parsers import BaseParser, ExcelParser, StreamingExcelParser
+from src.admin.repositories import SyncStateRepository
+from src.admin.sources import SOURCE_STATE_KEY, AdminSource, fetch
+from src.admin.sync_stats import SYNC_STATS_KEY
+from src.admin.update_db import UpdaterDB
+from src.config import settings
+from src.core.cache_keys import menu_namespace
+from src.core.cashe import Cache
+from src.dishes.models import Dish
+from src.dishes.repositories import DishRepository
+from src.dishes.services import DishService
+from src.main import app
+from src.menus.models import Menu
+from src.menus.repositories import MenuRepository
+from src.menus.services import MenuService
+from src.redis_conf import redis
+from src.submenus.models import SubMenu
+from src.submenus.repositories import SubMenuRepository
+from src.submenus.services import SubMenuService
+from tests.conftest import async_test_session_maker
+
+SHEET_URL = 'https://sheets.test/export'
+MENU_ID = 'ff210b5e-3910-11ee-be56-0242ac120002'
+SUBMENU_ID = '13d80f7a-3911-11ee-be56-0242ac120002'
+DISH_ID = '13d81222-3911-11ee-be56-0242ac120002'
+
+
+class FakeUpdater:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.runs = 0
+
+    async def update_db_from_admin_data(self):
+        self.runs += 1
+        if self.fail:
+            raise ValueError('broken sheet')
+
+
+class FakeParser(BaseParser):
+    def __init__(self, data: dict):
+        self.data = data
+
+    async def parse(self) -> dict[str, dict[str, dict]]:
+        # updater pops fields of parsed rows
+        return copy.deepcopy(self.data)
+
+
+@pytest.fixture(autouse=True)
+async def _clear_sync_state() -> AsyncGenerator:
+    yield
+    await redis.delete(SOURCE_STATE_KEY, SYNC_STATS_KEY)
+
+
+@pytest.fixture()
+def mock_http(monkeypatch: pytest.MonkeyPatch) -> Callable:
+    """Route requests of async clients to handler."""
+    def mock(handler: Callable[[httpx.Request], httpx.Response]) -> None:
+        client = functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(httpx, 'AsyncClient', client)
+    monkeypatch.setattr(settings, 'ADMIN_SOURCE_RETRY_BACKOFF_IN_SECONDS', 0)
+    return mock
+
+
+@pytest.fixture()
+def admin_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / 'Menu.xlsx'
+    path.write_bytes(b'first')
+    monkeypatch.setattr(settings, 'FROM_GOOGLE_SHEETS', False)
+    monkeypatch.setattr(settings, 'ADMIN_EXCEL_PATH', str(path))
+    return path
+
+
+@pytest.fixture()
+def updater(monkeypatch: pytest.MonkeyPatch) -> FakeUpdater:
+    updater = FakeUpdater()
+
+    async def get_updater_db(admin_source: object = None) -> FakeUpdater:
+        return updater
+
+    async def run_warm_up():
+        pass
+
+    monkeypatch.setattr(celery_conf, 'get_updater_db', get_updater_db)
+    monkeypatch.setattr(celery_conf, 'run_warm_up', run_warm_up)
+    return updater
+
+
+class TestAdminSource:
+    async def test_file_is_read_when_changed(self, admin_file: Path):
+        source = AdminSource(location=str(admin_file), redis=redis)
+        assert await source.read_if_changed() == b'first'
+        await source.save()
+        assert await AdminSource(location=str(admin_file), redis=redis).read_if_changed() is None
+        admin_file.write_bytes(b'second')
+        assert await AdminSource(location=str(admin_file), redis=redis).read_if_changed() == b'second'
+
+    async def test_touched_file_is_unchanged(self, admin_file: Path):
+        source = AdminSource(location=str(admin_file), redis=redis)
+        await source.read_if_changed()
+        await source.save()
+        os.utime(admin_file, ns=(0, 0))
+        assert await AdminSource(location=str(admin_file), redis=redis).read_if_changed() is None
+        state = await source.load()
+        assert state is not None, 'Состояние источника не сохранено'
+        assert state.mtime_ns == 0, 'Новый mtime не сохранен'
+
+    async def test_unsaved_content_is_read_again(self, admin_file: Path):
+        await AdminSource(location=str(admin_file), redis=redis).read_if_changed()
+        assert await AdminSource(location=str(admin_file), redis=redis).read_if_changed() == b'first'
+
+    async def test_url_with_validators(self, mock_http: Callable):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.headers.get('If-None-Match') == '"v1"':
+                return httpx.Response(status.HTTP_304_NOT_MODIFIED)
+            return httpx.Response(status.HTTP_200_OK, content=b'sheet', headers={'ETag': '"v1"'})
+
+        mock_http(handler)
+        source = AdminSource(location=SHEET_URL, redis=redis)
+        assert await source.read_if_changed() == b'sheet'
+        await source.save()
+        assert await AdminSource(location=SHEET_URL, redis=redis).read_if_changed() is None
+        assert requests[-1].headers['If-None-Match'] == '"v1"'
+
+
+class TestFetch:
+    async def test_server_and_connection_errors_are_retried(self, mock_http: Callable):
+        responses: Iterator[httpx.Response | Exception] = iter([
+            httpx.ConnectTimeout('timeout'),
+            httpx.Response(status.HTTP_503_SERVICE_UNAVAILABLE),
+            httpx.Response(status.HTTP_200_OK, content=b'sheet'),
+        ])
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        mock_http(handler)
+        assert (await fetch(SHEET_URL)).content == b'sheet'
+
+    async def test_error_of_last_attempt_is_raised(self, mock_http: Callable, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, 'ADMIN_SOURCE_RETRIES', 1)
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request)
+            raise httpx.ConnectError('refused')
+
+        mock_http(handler)
+        with pytest.raises(httpx.ConnectError):
+            await fetch(SHEET_URL)
+        assert len(attempts) == 2
+
+    async def test_client_errors_are_not_retried(self, mock_http: Callable):
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request)
+            return httpx.Response(status.HTTP_404_NOT_FOUND)
+
+        mock_http(handler)
+        assert (await fetch(SHEET_URL)).status_code == status.HTTP_404_NOT_FOUND
+        assert len(attempts) == 1
+
+
+class TestSyncAdminData:
+    async def test_unchanged_source_is_skipped(self, admin_file: Path, updater: FakeUpdater):
+        await celery_conf.update_db_async()
+        await celery_conf.update_db_async()
+        assert updater.runs == 1
+        admin_file.write_bytes(b'second')
+        await celery_conf.update_db_async()
+        assert updater.runs == 2
+
+    async def test_failed_sync_is_repeated(self, admin_file: Path, updater: FakeUpdater):
+        updater.fail = True
+        for _ in range(2):
+            with pytest.raises(ValueError, match='broken sheet'):
+                await celery_conf.update_db_async()
+        assert updater.runs == 2
+
+    async def test_skip_can_be_disabled(
+            self, admin_file: Path, updater: FakeUpdater, monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, 'ADMIN_SKIP_UNCHANGED', False)
+        await celery_conf.update_db_async()
+        await celery_conf.update_db_async()
+        assert updater.runs == 2
+
+    async def test_stats(self, admin_file: Path, updater: FakeUpdater, async_client: httpx.AsyncClient):
+        await celery_conf.update_db_async()
+        await celery_conf.update_db_async()
+        response = await async_client.get(app.url_path_for('get_admin_sync_stats'))
+        assert response.status_code == status.HTTP_200_OK
+        stats = response.json()
+        assert (stats['synced_runs'], stats['skipped_runs'], stats['failed_runs']) == (1, 1, 0)
+        assert stats['last_status'] == 'skipped'
+
+
+@pytest.fixture()
+def admin_data() -> dict:
+    return ExcelParser.read_excel(settings.ADMIN_EXCEL_PATH)
+
+
+class TestUpdaterDB:
+    @staticmethod
+    async def sync(data: dict | BaseParser, monkeypatch: pytest.MonkeyPatch | None = None) -> dict[str, int]:
+        """Sync data or data of parser, return number of writes by service method."""
+        writes: dict[str, int] = {}
+        async with async_test_session_maker() as session:
+            cache = Cache(redis=redis)
+            updater = UpdaterDB(
+                menu_service=MenuService(repository=MenuRepository(session=session), cache=cache),
+                submenu_service=SubMenuService(repository=SubMenuRepository(session=session), cache=cache),
+                dish_service=DishService(repository=DishRepository(session=session), cache=cache),
+                admin_parser=data if isinstance(data, BaseParser) else FakeParser(data),
+            )
+            if monkeypatch is not None:
+                for service in (updater.menu_service, updater.submenu_service, updater.dish_service):
+                    for method in ('create', 'update', 'delete'):
+                        monkeypatch.setattr(service, method, counted(getattr(service, method), writes, method))
+            await updater.update_db_from_admin_data()
+        return writes
+
+    @staticmethod
+    async def count(model: type) -> int:
+        async with async_test_session_maker() as session:
+            return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+    async def test_first_sync_writes_all_rows(self, admin_data: dict, monkeypatch: pytest.MonkeyPatch):
+        assert await self.sync(admin_data, monkeypatch) == {'create': 18}
+        assert [await self.count(model) for model in (Menu, SubMenu, Dish, SyncState)] == [2, 4, 12, 18]
+
+    async def test_only_changed_rows_are_written(self, admin_data: dict, monkeypatch: pytest.MonkeyPatch):
+        await self.sync(admin_data)
+        assert await self.sync(admin_data, monkeypatch) == {}
+        admin_data['dishes'][DISH_ID]['price'] = 100.5
+        assert await self.sync(admin_data, monkeypatch) == {'update': 1}
+        async with async_test_session_maker() as session:
+            assert str(await session.scalar(select(Dish.price).filter_by(id=DISH_ID))) == '100.50'
+
+    async def test_children_of_deleted_menu_are_not_deleted_again(
+            self, admin_data: dict, monkeypatch: pytest.MonkeyPatch,
+    ):
+        await self.sync(admin_data)
+        del admin_data['menus'][MENU_ID]
+        for kind in ('submenus', 'dishes'):
+            admin_data[kind] = {uid: row for uid, row in admin_data[kind].items() if row['menu_id'] != MENU_ID}
+        assert await self.sync(admin_data, monkeypatch) == {'delete': 1}
+        assert [await self.count(model) for model in (Menu, SubMenu, Dish, SyncState)] == [1, 2, 6, 9]
+
+    async def test_sync_by_chunks(self, admin_data: dict, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, 'ADMIN_SYNC_CHUNK_SIZE', 5)
+        assert await self.sync(StreamingExcelParser(source=settings.ADMIN_EXCEL_PATH), monkeypatch) == {'create': 18}
+        assert await self.sync(StreamingExcelParser(source=settings.ADMIN_EXCEL_PATH), monkeypatch) == {}
+        del admin_data['dishes'][DISH_ID]
+        assert await self.sync(admin_data, monkeypatch) == {'delete': 1}
+        assert [await self.count(model) for model in (Menu, SubMenu, Dish, SyncState)] == [2, 4, 11, 17]
+
+    async def test_sync_without_state_compares_with_db(self, admin_data: dict, monkeypatch: pytest.MonkeyPatch):
+        await self.sync(admin_data)
+        async with async_test_session_maker() as session:
+            await SyncStateRepository(session=session).clear()
+        assert await self.sync(admin_data, monkeypatch) == {'update': 18}
+        assert await self.count(SyncState) == 18
+
+    async def test_failed_sync_clears_state(self, admin_data: dict):
+        await self.sync(admin_data)
+        admin_data['dishes'][DISH_ID]['price'] = 'not a price'
+        with pytest.raises(ValueError, match='price'):
+            await self.sync(admin_data)
+        assert await self.count(SyncState) == 0
+
+    async def test_failed_sync_invalidates_written_rows(self, admin_data: dict):
+        await self.sync(admin_data)
+        generation = await Cache(redis=redis).get_generation(menu_namespace(MENU_ID))
+        admin_data['menus'][MENU_ID]['title'] = 'Новое меню'
+        admin_data['dishes'][DISH_ID]['price'] = 'not a price'
+        with pytest.raises(ValueError, match='price'):
+            await self.sync(admin_data)
+        assert await Cache(redis=redis).get_generation(menu_namespace(MENU_ID)) != generation
+
+
+def counted(method: Callable, writes: dict[str, int], name: str) -> Callable:
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        writes[name] = writes.get(name, 0) + 1
+        return await method(*args, **kwargs)
+    return wrapper
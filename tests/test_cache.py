@@ -0,0 +1,483 @@
+import asyncio
+import contextlib
+import json
+import time
+import uuid
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from pydantic import TypeAdapter
+
+from src.config import settings
+from src.core.cache_keys import (
+    MENUS_NAMESPACE,
+    menu_key,
+    menu_namespace,
+    menus_key,
+    relations_key,
+    submenu_key,
+    submenu_namespace,
+)
+from src.core.cache_stats import cache_stats
+from src.core.cashe import (
+    Cache,
+    get_bloom_filter,
+    get_generation_key,
+    get_generation_ttl,
+)
+from src.core.codecs import ENCODERS, encode
+from src.core.local_cache import LocalCache, listen_invalidations
+from src.dishes.models import Dish
+from src.dishes.schemas import CreateDishOutput
+from src.main import app
+from src.menus.models import Menu
+from src.menus.repositories import MenuRepository
+from src.menus.schemas import MenuCreateInput, MenuWithRelations
+from src.menus.services import MenuService
+from src.redis_conf import redis
+from src.submenus.models import SubMenu
+from src.warm_up import warm_up_cache
+from tests.conftest import async_test_session_maker
+from tests.utils import count_statements, without_order
+
+CONCURRENT_REQUESTS = 20
+
+
+@pytest.fixture(autouse=True)
+async def _flush_cache() -> AsyncGenerator:
+    """Cached responses of these tests must not leak to other tests."""
+    yield
+    await redis.flushall()
+
+
+class TestLocalCache:
+    """Тесты локального кеша процесса."""
+
+    async def test_local_cache_is_bounded(self):
+        """Тест - размер локального кеша ограничен, считаются попадания."""
+        local = LocalCache(maxsize=2, ttl=60)
+        for key in ('first', 'second', 'third'):
+            local.set(key, key.encode())
+        assert local.get('first') is None, 'Старый ключ не вытеснен'
+        assert local.get('third') == b'third', 'Новый ключ не сохранен'
+        assert local.stats()['size'] == 2, 'Размер кеша превышен'
+        assert local.hit_ratio == 0.5, 'Неверная доля попаданий'
+
+    async def test_get_from_local_cache(self):
+        """Тест - чтение из локального кеша без обращения к redis."""
+        cache = Cache(redis=redis, local=LocalCache(maxsize=10, ttl=60))
+        await cache.set('local_key', b'[1]')
+        await redis.delete('local_key')
+        assert await cache.get('local_key') == b'[1]', 'Значение не взято из памяти'
+        await cache.clear('local_key')
+        assert await cache.get('local_key') is None, 'Значение не удалено из памяти'
+
+    async def test_invalidation_from_other_instance(self):
+        """Тест - очистка кеша другим экземпляром приложения."""
+        local = LocalCache(maxsize=10, ttl=60)
+        listener = asyncio.create_task(listen_invalidations(redis=redis, local_cache=local))
+        await asyncio.sleep(0.1)
+        local.set('menu_1', b'{}')
+        local.set(get_generation_key('menu_2'), b'1')
+        await Cache(redis=redis).clear('menu_1')
+        await Cache(redis=redis).invalidate('menu_2')
+        for _ in range(50):
+            if not local.data:
+                break
+            await asyncio.sleep(0.01)
+        listener.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await listener
+        assert not local.data, 'Ключи не удалены из локального кеша'
+
+
+class TestGenerationInvalidation:
+    """Тесты очистки кеша сменой поколения пространства имен."""
+
+    async def test_invalidate_namespace(self):
+        """Тест - устаревают только ключи пространства имен, старые значения удаляются по ttl."""
+        cache = Cache(redis=redis)
+        built = []
+
+        def factory(value: bytes) -> Callable[[], Awaitable[bytes]]:
+            async def build() -> bytes:
+                built.append(value)
+                return value
+            return build
+
+        keys = {b'1': menu_key(1), b'2': submenu_key(1, 2), b'10': menu_key(10)}
+        for value, key in keys.items():
+            await cache.get_cached_body(key, factory(value))
+        old_key, _ = await cache.resolve(menu_key(1))
+        await cache.invalidate(menu_namespace(1))
+        for value, key in keys.items():
+            await cache.get_cached_body(key, factory(value))
+        assert built == [b'1', b'2', b'10', b'1', b'2'], 'Устарели не те ключи'
+        assert 0 < await redis.ttl(old_key) <= settings.CACHE_TTL_IN_SECONDS, 'Старое значение хранится без ttl'
+
+    async def test_expired_generation_is_not_repeated(self):
+        """Тест - ключ поколения хранится c ttl, после истечения ключа не повторяются ключи значений и etag."""
+        cache = Cache(redis=redis)
+        generation_key = get_generation_key(menu_namespace(1))
+        await cache.invalidate(menu_namespace(1))
+        resolved = [await cache.resolve(menu_key(1))]
+        assert 0 < await redis.ttl(generation_key) <= get_generation_ttl(), 'Поколение хранится без ttl'
+        await redis.delete(generation_key)
+        resolved.append(await cache.resolve(menu_key(1)))
+        await redis.delete(generation_key)
+        await cache.invalidate(menu_namespace(1))
+        resolved.append(await cache.resolve(menu_key(1)))
+        assert len({redis_key for redis_key, _ in resolved}) == 3, 'Ключ поколения повторился'
+        assert len({etag for _, etag in resolved}) == 3, 'Etag поколения повторился'
+
+    async def test_generation_above_counter_without_clock(self):
+        """Тест - новое поколение больше поколения, увеличенного без общего счетчика."""
+        await redis.set(get_generation_key(menu_namespace(1)), 10)
+        await Cache(redis=redis).invalidate(menu_namespace(1))
+        assert await redis.get(get_generation_key(menu_namespace(1))) == b'11', 'Поколение повторилось'
+
+
+class TestBatching:
+    """Тесты пакетной работы c redis."""
+
+    async def test_get_many_and_set_many(self):
+        """Тест - пакетные запись и чтение ключей."""
+        cache = Cache(redis=redis, local=LocalCache(maxsize=10, ttl=60))
+        await cache.set_many({'first': b'1', 'second': b'2'})
+        cache.local.evict('first')
+        assert await cache.get_many(['first', 'missing', 'second']) == [b'1', None, b'2'], 'Значения прочитаны неверно'
+
+    async def test_invalidations_of_request_flushed_once(self):
+        """Тест - все инвалидации запроса выполняются одним сбросом."""
+        cache = Cache(redis=redis)
+        cache.invalidate_later(MENUS_NAMESPACE, menu_namespace(1))
+        cache.invalidate_later(MENUS_NAMESPACE, submenu_namespace(1, 2))
+        assert await cache.get_generation(MENUS_NAMESPACE) is None, 'Инвалидация выполнена до сброса'
+        await cache.flush()
+        await cache.flush()
+        generations = [
+            await cache.get_generation(namespace)
+            for namespace in (MENUS_NAMESPACE, menu_namespace(1), submenu_namespace(1, 2))
+        ]
+        assert generations == [b'1', b'1', b'1'], 'Поколения увеличены неверно'
+
+
+class TestSingleFlight:
+    """Тесты защиты от одновременного построения кеша."""
+
+    async def test_concurrent_misses_query_db_once(self, async_client: AsyncClient, menu: Menu):
+        """Тест - N одновременных промахов кеша выполняют один запрос в базу."""
+        await redis.flushall()
+        url = app.url_path_for('get_menus')
+        with count_statements() as statements:
+            responses = await asyncio.gather(*[async_client.get(url) for _ in range(CONCURRENT_REQUESTS)])
+        assert all(response.status_code == status.HTTP_200_OK for response in responses), 'Код ответа некорректный'
+        assert all(response.json() == responses[0].json() for response in responses), 'Ответы отличаются'
+        assert len(statements) == 1, 'Запрос в базу выполнен больше одного раза'
+
+    async def test_wait_for_value_built_by_other_instance(self, monkeypatch: pytest.MonkeyPatch):
+        """Тест - при занятой блокировке ждем значение от другого экземпляра."""
+        monkeypatch.setattr(settings, 'CACHE_LOCK_ENABLED', True)
+        cache = Cache(redis=redis)
+        lock = redis.lock('lock_locked_key', timeout=settings.CACHE_LOCK_TIMEOUT_IN_SECONDS)
+        await lock.acquire()
+
+        async def build_on_other_instance() -> None:
+            await asyncio.sleep(0.1)
+            await cache.set('locked_key', b'other')
+            await lock.release()
+
+        async def factory() -> bytes:
+            return b'this'
+
+        other = asyncio.create_task(build_on_other_instance())
+        value = await cache.get_or_set('locked_key', factory)
+        await other
+        await cache.clear('locked_key')
+        assert value == b'other', 'Значение построено повторно'
+
+
+class TestCodecs:
+    """Тесты сериализации и сжатия значений кеша."""
+
+    @pytest.mark.parametrize('encoder', list(ENCODERS))
+    async def test_encoders_give_same_body(self, encoder: str, monkeypatch: pytest.MonkeyPatch):
+        """Тест - все сериализаторы отдают одинаковое тело ответа."""
+        adapter = TypeAdapter(list[CreateDishOutput])
+        dishes = [
+            CreateDishOutput(id='1', title='Блюдо', description='', price=Decimal('1.50'), discount=Decimal('0.1')),
+        ]
+        monkeypatch.setattr(settings, 'CACHE_ENCODER', encoder)
+        assert encode(adapter, dishes) == adapter.dump_json(dishes), 'Тело ответа отличается'
+        tree_adapter = TypeAdapter(list[MenuWithRelations])
+        tree = tree_adapter.validate_python([{
+            'id': uuid.uuid4(),
+            'title': 'Меню "дня"',
+            'description': '',
+            'submenus': [{'id': uuid.uuid4(), 'title': 'Подменю', 'description': '', 'dishes': dishes}],
+        }])
+        assert encode(tree_adapter, tree) == tree_adapter.dump_json(tree), 'Тело дерева отличается'
+
+    @pytest.mark.parametrize('compression', ['zlib', 'zstd'])
+    async def test_compression(self, compression: str, monkeypatch: pytest.MonkeyPatch):
+        """Тест - большие значения хранятся в redis сжатыми."""
+        if compression == 'zstd':
+            pytest.importorskip('zstandard')
+        monkeypatch.setattr(settings, 'CACHE_COMPRESSION', compression)
+        cache = Cache(redis=redis)
+        small, big = b'[]', b'[' + b'{"id":"1"},' * 1000 + b'{"id":"1"}]'
+        await cache.set('small_key', small)
+        await cache.set('big_key', big)
+        assert await redis.get('small_key') == small, 'Маленькое значение сжато'
+        assert len(await redis.get('big_key')) < len(big), 'Большое значение не сжато'
+        assert await cache.get('big_key') == big, 'Значение искажено при сжатии'
+        await cache.clear('small_key', 'big_key')
+
+
+class TestConditionalGet:
+    """Тесты условных запросов по ETag."""
+
+    async def test_not_modified(self, async_client: AsyncClient, menu: Menu):
+        """Тест - при актуальном ETag тело не передается."""
+        url = app.url_path_for('get_menus')
+        response = await async_client.get(url)
+        etag = response.headers.get('etag')
+        assert etag, 'ETag не передан'
+        response = await async_client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED, 'Код ответа некорректный'
+        assert not response.content, 'Передано тело ответа'
+        assert response.headers.get('etag') == etag, 'ETag изменился без изменения данных'
+
+    async def test_etag_changed_after_update(
+        self,
+        async_client: AsyncClient,
+        menu: Menu,
+        submenu: SubMenu,
+        dish: Dish,
+    ):
+        """Тест - ETag блюда и списков меняется после изменения блюда."""
+        dish_url = app.url_path_for('get_dish', menu_id=menu.id, submenu_id=submenu.id, dish_id=dish.id)
+        relations_url = app.url_path_for('get_menu_with_relations')
+        dish_etag = (await async_client.get(dish_url)).headers.get('etag')
+        relations_etag = (await async_client.get(relations_url)).headers.get('etag')
+        await async_client.patch(
+            app.url_path_for('update_dish', menu_id=menu.id, submenu_id=submenu.id, dish_id=dish.id),
+            json={'title': 'Новое блюдо', 'description': 'Новое описание', 'price': '2.50'},
+        )
+        response = await async_client.get(dish_url, headers={'If-None-Match': dish_etag})
+        assert response.status_code == status.HTTP_200_OK, 'Изменение блюда не отдано'
+        assert response.json().get('title') == 'Новое блюдо', 'Отдано старое блюдо'
+        response = await async_client.get(relations_url, headers={'If-None-Match': relations_etag})
+        assert response.status_code == status.HTTP_200_OK, 'Изменение дерева меню не отдано'
+
+
+class TestStaleWhileRevalidate:
+    """Тесты отдачи устаревшего кеша во время обновления."""
+
+    async def test_stale_menus_while_refresh(
+        self,
+        async_client: AsyncClient,
+        menu: Menu,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Тест - после изменения отдается старый список, затем обновленный."""
+        monkeypatch.setattr(settings, 'CACHE_MAX_STALENESS_IN_SECONDS', {'menus': 30})
+        url = app.url_path_for('get_menus')
+        await async_client.get(url)
+        await async_client.post(
+            app.url_path_for('create_menu'),
+            json={'title': 'Новое меню', 'description': 'Новое описание'},
+        )
+        response = await async_client.get(url)
+        assert len(response.json()) == 1, 'Не отдан устаревший список меню'
+        assert 'etag' not in response.headers, 'Устаревший ответ отдан с актуальным ETag'
+        response = await async_client.get(url)
+        assert len(response.json()) == 2, 'Список меню не обновлен в фоне'
+        assert 'etag' in response.headers, 'Актуальный ответ отдан без ETag'
+
+    async def test_too_stale_menus_rebuilt(
+        self,
+        async_client: AsyncClient,
+        menu: Menu,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Тест - слишком старый кеш не отдается."""
+        monkeypatch.setattr(settings, 'CACHE_MAX_STALENESS_IN_SECONDS', {'menus': 30})
+        url = app.url_path_for('get_menus')
+        await async_client.get(url)
+        await async_client.post(
+            app.url_path_for('create_menu'),
+            json={'title': 'Новое меню', 'description': 'Новое описание'},
+        )
+        await redis.set('stale_since_menus', int(time.time()) - 60)
+        response = await async_client.get(url)
+        assert len(response.json()) == 2, 'Отдан слишком старый список меню'
+
+
+class TestWarmUp:
+    """Тесты прогрева кеша."""
+
+    async def test_warm_up_gives_same_bodies(
+        self,
+        async_client: AsyncClient,
+        menu: Menu,
+        submenu: SubMenu,
+        two_dishes: Dish,
+    ):
+        """Тест - после прогрева ответы берутся из кеша и совпадают c ответами из базы."""
+        urls = [
+            app.url_path_for('get_menus'),
+            app.url_path_for('get_menu_with_relations'),
+            app.url_path_for('get_menu', menu_id=menu.id),
+            app.url_path_for('get_submenus', menu_id=menu.id),
+            app.url_path_for('get_dishes', menu_id=menu.id, submenu_id=submenu.id),
+        ]
+        bodies_from_db = [(await async_client.get(url)).content for url in urls]
+        await redis.flushall()
+        async with async_test_session_maker() as session:
+            warmed = await warm_up_cache(session, Cache(redis=redis), concurrency=2, batch_size=2)
+        with count_statements() as statements:
+            bodies_from_cache = [(await async_client.get(url)).content for url in urls]
+        assert warmed == len(urls), 'Прогреты не все ключи'
+        assert not statements, 'Ответы прогретого кеша читались из базы'
+        assert [without_order(json.loads(body)) for body in bodies_from_cache] == [
+            without_order(json.loads(body)) for body in bodies_from_db
+        ], 'Прогретые ответы отличаются от ответов из базы'
+
+    async def test_write_during_warm_up(self, menu: Menu, monkeypatch: pytest.MonkeyPatch):
+        """Тест - запись во время прогрева оставляет прочитанные до нее ответы под старыми поколениями."""
+        cache = Cache(redis=redis)
+        set_bodies = cache.set_bodies
+
+        async def write_and_set_bodies(*args: list) -> None:
+            await cache.invalidate(MENUS_NAMESPACE, menu_namespace(str(menu.id)))
+            await set_bodies(*args)
+
+        monkeypatch.setattr(cache, 'set_bodies', write_and_set_bodies)
+        async with async_test_session_maker() as session:
+            await warm_up_cache(session, cache, concurrency=1, batch_size=10)
+        for key in (menus_key(), relations_key(), menu_key(str(menu.id))):
+            redis_key, _ = await cache.resolve(key)
+            assert await cache.get(redis_key) is None, 'Ответ сохранен для поколения после записи'
+
+
+class TestNotFound:
+    """Тесты кеширования отсутствующих объектов."""
+
+    async def test_not_found_cached_until_created(self, async_client: AsyncClient):
+        """Тест - 404 берется из кеша, пока объект c этим id не создан."""
+        menu_id = uuid.uuid4()
+        url = app.url_path_for('get_menu', menu_id=menu_id)
+        response = await async_client.get(url)
+        assert response.status_code == status.HTTP_404_NOT_FOUND, 'Код ответа некорректный'
+        with count_statements() as statements:
+            response = await async_client.get(url)
+        assert response.status_code == status.HTTP_404_NOT_FOUND, 'Код ответа некорректный'
+        assert response.json() == {'detail': 'menu not found'}, 'Сообщение об ошибке некорректное'
+        assert not statements, 'Отсутствующий объект запрошен из базы повторно'
+        async with async_test_session_maker() as session:
+            service = MenuService(repository=MenuRepository(session=session), cache=Cache(redis=redis))
+            await service.create(MenuCreateInput(title='Меню', description='Описание'), id=str(menu_id))
+            await service.cache.flush()
+        response = await async_client.get(url)
+        assert response.status_code == status.HTTP_200_OK, 'Созданный объект не найден'
+
+    async def test_bloom_filter(self, async_client: AsyncClient, menu: Menu, monkeypatch: pytest.MonkeyPatch):
+        """Тест - фильтр существующих id отвечает 404 без базы, созданные объекты находятся."""
+        monkeypatch.setattr(settings, 'CACHE_BLOOM_ENABLED', True)
+        async with async_test_session_maker() as session:
+            await warm_up_cache(session, Cache(redis=redis), concurrency=1, batch_size=10)
+        with count_statements() as statements:
+            response = await async_client.get(app.url_path_for('get_menu', menu_id=uuid.uuid4()))
+        assert response.status_code == status.HTTP_404_NOT_FOUND, 'Код ответа некорректный'
+        assert not statements, 'Отсутствующий объект запрошен из базы'
+        response = await async_client.post(
+            app.url_path_for('create_menu'),
+            json={'title': 'Новое меню', 'description': 'Новое описание'},
+        )
+        response = await async_client.get(app.url_path_for('get_menu', menu_id=response.json()['id']))
+        assert response.status_code == status.HTTP_200_OK, 'Созданный объект не найден'
+        response = await async_client.get(app.url_path_for('get_menu', menu_id=menu.id))
+        assert response.status_code == status.HTTP_200_OK, 'Существующий объект не найден'
+
+    async def test_concurrent_bloom_rebuilds(self, menu: Menu, monkeypatch: pytest.MonkeyPatch):
+        """Тест - одновременный прогрев воркеров не публикует недостроенный фильтр."""
+        monkeypatch.setattr(settings, 'CACHE_BLOOM_ENABLED', True)
+
+        async def warm_up() -> None:
+            async with async_test_session_maker() as session:
+                await warm_up_cache(session, Cache(redis=redis), concurrency=1, batch_size=10)
+
+        await asyncio.gather(*[warm_up() for _ in range(CONCURRENT_REQUESTS)])
+        bloom_filter = get_bloom_filter(redis, 'menu')
+        assert await redis.exists(bloom_filter.ready_key), 'Фильтр не построен'
+        assert await bloom_filter.may_contain(str(menu.id)), 'Существующий объект не найден'
+        assert not await redis.exists(bloom_filter.lock_key), 'Блокировка перестроения не снята'
+
+    async def test_bloom_rebuild_after_expired_lock(self):
+        """Тест - перестроение c истекшей блокировкой не заменяет фильтр другого перестроения."""
+        first, second = get_bloom_filter(redis, 'menu'), get_bloom_filter(redis, 'menu')
+        first_token = await first.start_rebuild(timeout=10)
+        assert first_token is not None, 'Перестроение не запущено'
+        assert await second.start_rebuild(timeout=10) is None, 'Запущено второе перестроение'
+        # lock of first rebuild expired
+        await redis.delete(first.lock_key)
+        second_token = await second.start_rebuild(timeout=10)
+        assert second_token is not None, 'Перестроение после истечения блокировки не запущено'
+        assert not await first.finish_rebuild(first_token, ['first']), 'Фильтр заменен без блокировки'
+        assert await second.finish_rebuild(second_token, ['second']), 'Фильтр не заменен'
+        assert await second.may_contain('second'), 'Элемент перестроения не найден'
+
+
+class TestStats:
+    """Тесты статистики кеша."""
+
+    async def test_stats_per_family(self, async_client: AsyncClient, menu: Menu):
+        """Тест - попадания, промахи, записи и инвалидации считаются по семействам ключей."""
+        cache_stats.reset()
+        url = app.url_path_for('get_menus')
+        await async_client.get(url)
+        await async_client.get(url)
+        await async_client.post(
+            app.url_path_for('create_menu'),
+            json={'title': 'Новое меню', 'description': 'Новое описание'},
+        )
+        stats = (await async_client.get(app.url_path_for('get_cache_stats'))).json()['families']
+        assert stats['menus']['hits'] == 1, 'Попадания посчитаны неверно'
+        assert stats['menus']['misses'] == 1, 'Промахи посчитаны неверно'
+        assert stats['menus']['sets'] == 1, 'Записи посчитаны неверно'
+        assert stats['menus']['set_bytes'] > 0, 'Размер значений не посчитан'
+        assert stats['menus']['invalidations'] == 1, 'Инвалидации посчитаны неверно'
+        assert stats['relations']['invalidations'] == 1, 'Инвалидации дерева меню не посчитаны'
+        assert stats['dish']['invalidations'] == 1, 'Инвалидации блюд нового меню не посчитаны'
+        response = await async_client.get(app.url_path_for('get_metrics'))
+        assert response.headers['content-type'].startswith('text/plain'), 'Формат метрик некорректный'
+        assert 'cache_hits_total{family="menus"} 1' in response.text, 'Метрика попаданий не передана'
+
+
+class TestBudget:
+    """Тесты ограничений кеша по семействам ключей."""
+
+    async def test_family_ttl_and_max_size(
+        self,
+        async_client: AsyncClient,
+        menu: Menu,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Тест - ttl семейства применяется, слишком большие значения не кешируются."""
+        monkeypatch.setattr(settings, 'CACHE_FAMILY_TTL_IN_SECONDS', {'menus': 60})
+        monkeypatch.setattr(settings, 'CACHE_FAMILY_MAX_SIZE_IN_BYTES', {'relations': 1})
+        cache_stats.reset()
+        await async_client.get(app.url_path_for('get_menus'))
+        await async_client.get(app.url_path_for('get_menu_with_relations'))
+        menus_redis_key, relations_redis_key = await Cache(redis=redis).resolve_many([menus_key(), relations_key()])
+        assert 0 < await redis.ttl(menus_redis_key) <= 60, 'Ttl семейства не применен'
+        assert not await redis.exists(relations_redis_key), 'Слишком большое значение закешировано'
+        assert cache_stats['relations'].oversized == 1, 'Пропуск большого значения не посчитан'
+        report = (await async_client.get(app.url_path_for('get_cache_memory'))).json()
+        assert report['menus']['keys'] == 1, 'Ключи семейства посчитаны неверно'
+        assert report['menus']['memory_bytes'] > 0, 'Память семейства не посчитана'
+        assert report['relations']['keys'] == 0, 'Ключи семейства посчитаны неверно'
@@ -37,6 +37,31 @@ class TestCountFields:
         response_data = response.json()[0]
         assert response_data.get('dishes_count') == 2, 'Неверное количество блюд'
 
+    async def test_count_fields_after_deletes(
+        self,
+        async_client: AsyncClient,
+        menu: Menu,
+        submenu: SubMenu,
+        two_dishes: list[Dish],
+    ):
+        """Тест - поля подсчета обновляются при удалении блюда и каскадном удалении подменю."""
+        await async_client.post(
+            app.url_path_for('create_submenu', menu_id=menu.id),
+            json={'title': 'Второе подменю', 'description': 'Описание'},
+        )
+        await async_client.delete(
+            app.url_path_for('delete_dish', menu_id=menu.id, submenu_id=submenu.id, dish_id=two_dishes[0].id),
+        )
+        async with async_test_session_maker() as db:
+            menu_in_db = await get_object(db=db, model=Menu, id=menu.id)
+            submenu_in_db = await get_object(db=db, model=SubMenu, id=submenu.id)
+        assert (menu_in_db.submenus_count, menu_in_db.dishes_count) == (2, 1), 'Неверные счетчики меню'
+        assert submenu_in_db.dishes_count == 1, 'Неверный счетчик подменю'
+        await async_client.delete(app.url_path_for('delete_submenu', menu_id=menu.id, submenu_id=submenu.id))
+        async with async_test_session_maker() as db:
+            menu_in_db = await get_object(db=db, model=Menu, id=menu.id)
+        assert (menu_in_db.submenus_count, menu_in_db.dishes_count) == (1, 0), 'Неверные счетчики после удаления'
+
 
 class TestCascadeDelete:
     """Тестирование каскадного удаления."""
@@ -8,7 +8,7 @@ from src.main import app
 from src.menus.models import Menu
 from src.submenus.models import SubMenu
 from tests.conftest import async_test_session_maker
-from tests.utils import get_object
+from tests.utils import bulk_create, get_object
 
 
 class TestCrudDishes:
@@ -241,3 +241,18 @@ class TestCrudDishes:
         assert response.status_code == status.HTTP_404_NOT_FOUND, (
             'Если блюда не существует, должно отображать ошибку 404'
         )
+
+    async def test_get_dishes_page(self, async_client: AsyncClient, menu: Menu, submenu: SubMenu):
+        """Тест - страницы блюд совпадают co списком блюд."""
+        async with async_test_session_maker() as db:
+            datas = [{'title': f'Блюдо {index}', 'description': '', 'price': 10, 'submenu_id': submenu.id}
+                     for index in range(3)]
+            await bulk_create(db, datas, Dish)
+        url = app.url_path_for('get_dishes', menu_id=menu.id, submenu_id=submenu.id)
+        dishes = sorted((await async_client.get(url)).json(), key=lambda dish: dish['id'])
+        response = await async_client.get(url, params={'limit': 2})
+        assert response.status_code == status.HTTP_200_OK, 'Некорректный статус код'
+        page = response.json()
+        assert page['items'] == dishes[:2], 'Некорректные блюда на первой странице'
+        response = await async_client.get(url, params={'limit': 2, 'cursor': page['next_cursor']})
+        assert response.json() == {'items': dishes[2:], 'next_cursor': None}, 'Некорректная последняя страница'
@@ -1,14 +1,26 @@
 import uuid
 
-from fastapi import status
+import pytest
+from fastapi import HTTPException, status
 from httpx import AsyncClient
 
+from src.config import settings
 from src.dishes.models import Dish
 from src.main import app
 from src.menus.models import Menu
+from src.menus.repositories import MenuRepository
+from src.menus.schemas import MenuCreateInput
+from src.redis_conf import redis
 from src.submenus.models import SubMenu
 from tests.conftest import async_test_session_maker
-from tests.utils import count_objects, get_object
+from tests.utils import (
+    bulk_create,
+    count_objects,
+    count_statements,
+    create_object,
+    get_object,
+    without_order,
+)
 
 
 class TestCrudMenu:
@@ -66,6 +78,56 @@ class TestCrudMenu:
             },
         ]
 
+    async def test_get_menus_with_relations_json_engine(
+            self,
+            menu: Menu,
+            submenu: SubMenu,
+            dish: Dish,
+            async_client: AsyncClient,
+    ):
+        """Тест - дерево меню из json базы совпадает c деревом из orm."""
+        async with async_test_session_maker() as db:
+            # half of cent is rounded to even as in schemas
+            dish_data = {'title': 'Блюдо', 'description': '', 'price': 1.25, 'discount': 0.1, 'submenu_id': submenu.id}
+            await create_object(db, dish_data, Dish)
+            await create_object(db, {'title': 'Пустое меню', 'description': ''}, Menu)
+        url = app.url_path_for('get_menu_with_relations')
+        await redis.flushall()
+        responses = [await async_client.get(url, params={'engine': 'orm'})]
+        await redis.flushall()
+        with count_statements() as statements:
+            responses.append(await async_client.get(url, params={'engine': 'json'}))
+        assert len(statements) == 1, 'Дерево из json собрано не одним запросом'
+        assert all(response.status_code == status.HTTP_200_OK for response in responses), 'Некорректный статус код'
+        orm_menus, json_menus = (without_order(response.json()) for response in responses)
+        assert json_menus == orm_menus, 'Дерево из json базы отличается'
+
+    async def test_stream_menus_with_relations(
+            self,
+            menu: Menu,
+            submenu: SubMenu,
+            dish: Dish,
+            async_client: AsyncClient,
+            monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Тест - потоковое дерево меню совпадает c деревом из orm."""
+        monkeypatch.setattr(settings, 'RELATIONS_STREAM_CHUNK_SIZE_IN_BYTES', 1)
+        monkeypatch.setattr(settings, 'RELATIONS_STREAM_BATCH_SIZE', 1)
+        async with async_test_session_maker() as db:
+            empty_submenu = {'title': 'Пустое подменю', 'description': '', 'menu_id': menu.id}
+            await create_object(db, empty_submenu, SubMenu)
+            dish_data = {'title': 'Блюдо', 'description': '', 'price': 1.25, 'discount': 0.1, 'submenu_id': submenu.id}
+            await create_object(db, dish_data, Dish)
+            await create_object(db, {'title': 'Пустое меню', 'description': ''}, Menu)
+        url = app.url_path_for('get_menu_with_relations')
+        await redis.flushall()
+        orm_response = await async_client.get(url, params={'engine': 'orm'})
+        stream_response = await async_client.get(url, params={'engine': 'stream'})
+        assert stream_response.status_code == status.HTTP_200_OK, 'Некорректный статус код'
+        assert without_order(stream_response.json()) == without_order(orm_response.json()), (
+            'Потоковое дерево отличается'
+        )
+
     async def test_get_single_menu(self, async_client: AsyncClient, menu: Menu):
         """Тест - получение одиночного меню по id."""
         url = app.url_path_for('get_menu', menu_id=menu.id)
@@ -185,3 +247,93 @@ class TestCrudMenu:
         assert response.status_code == status.HTTP_404_NOT_FOUND, (
             'Если меню не существует, должно отображать ошибку 404',
         )
+
+    async def test_create_duplicate_menu(self, async_client: AsyncClient, menu: Menu):
+        """Тест - создать меню c существующим заголовком."""
+        url = app.url_path_for('create_menu')
+        response = await async_client.post(url, json={'title': menu.title, 'description': 'Другое описание'})
+        assert response.status_code == status.HTTP_403_FORBIDDEN, 'Некорректный статус код'
+        assert response.json()['detail'] == f'Menu with title - {menu.title}, already exist', (
+            'Некорректное сообщение об ошибке',
+        )
+        async with async_test_session_maker() as db:
+            assert await count_objects(db, Menu) == 1, 'Дубликат меню создан в базе'
+
+    async def test_create_menu_with_existing_id(self, menu: Menu):
+        """Тест - создать меню c существующим id."""
+        async with async_test_session_maker() as db:
+            with pytest.raises(HTTPException) as error:
+                await MenuRepository(session=db).create(
+                    MenuCreateInput(title='Другое меню', description=''),
+                    id=str(menu.id),
+                )
+        assert error.value.status_code == status.HTTP_403_FORBIDDEN, 'Некорректный статус код'
+        assert error.value.detail == 'menu with this id already exist', 'Некорректное сообщение об ошибке'
+
+    async def test_update_menu_with_duplicate_title(self, async_client: AsyncClient, menu: Menu):
+        """Тест - обновить меню заголовком другого меню."""
+        url = app.url_path_for('create_menu')
+        response = await async_client.post(url, json={'title': 'Другое меню', 'description': ''})
+        url = app.url_path_for('update_menu', menu_id=response.json()['id'])
+        response = await async_client.patch(url, json={'title': menu.title, 'description': ''})
+        assert response.status_code == status.HTTP_403_FORBIDDEN, 'Некорректный статус код'
+
+    async def test_writes_in_one_statement(self, async_client: AsyncClient):
+        """Тест - создание, обновление и удаление меню выполняются одним запросом в базу."""
+        url = app.url_path_for('create_menu')
+        with count_statements() as statements:
+            response = await async_client.post(url, json={'title': 'Меню', 'description': ''})
+        assert response.status_code == status.HTTP_201_CREATED, 'Некорректный статус код'
+        assert len(statements) == 1, 'Создание выполнило лишние запросы'
+        url = app.url_path_for('update_menu', menu_id=response.json()['id'])
+        with count_statements() as statements:
+            response = await async_client.patch(url, json={'title': 'Новое меню', 'description': ''})
+        assert response.status_code == status.HTTP_200_OK, 'Некорректный статус код'
+        assert len(statements) == 1, 'Обновление выполнило лишние запросы'
+        url = app.url_path_for('delete_menu', menu_id=response.json()['id'])
+        with count_statements() as statements:
+            response = await async_client.delete(url)
+        assert response.status_code == status.HTTP_200_OK, 'Некорректный статус код'
+        assert len(statements) == 1, 'Удаление выполнило лишние запросы'
+
+
+class TestMenuPages:
+    """Тесты постраничного вывода меню."""
+
+    async def test_walk_pages(self, async_client: AsyncClient):
+        """Тест - страницы по курсору содержат все меню по одному разу."""
+        async with async_test_session_maker() as db:
+            menus = await bulk_create(db, [{'title': f'Меню {index}', 'description': ''} for index in range(5)], Menu)
+        url = app.url_path_for('get_menus')
+        ids: list[str] = []
+        pages, params = 0, {'limit': 2}
+        while True:
+            response = await async_client.get(url, params=params)
+            assert response.status_code == status.HTTP_200_OK, 'Некорректный статус код'
+            page = response.json()
+            ids.extend(item['id'] for item in page['items'])
+            pages += 1
+            if page['next_cursor'] is None:
+                break
+            params['cursor'] = page['next_cursor']
+        assert pages == 3, 'Некорректное количество страниц'
+        assert ids == sorted(str(menu.id) for menu in menus), 'Страницы не упорядочены по id'
+
+    async def test_whole_list_by_default(self, async_client: AsyncClient, menu: Menu):
+        """Тест - без limit и cursor список отдается целиком."""
+        response = await async_client.get(app.url_path_for('get_menus'))
+        assert isinstance(response.json(), list), 'Список меню изменил формат'
+
+    async def test_invalid_cursor(self, async_client: AsyncClient):
+        """Тест - некорректный курсор."""
+        response = await async_client.get(app.url_path_for('get_menus'), params={'cursor': 'not a cursor'})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY, 'Некорректный статус код'
+
+    async def test_page_invalidated_on_create(self, async_client: AsyncClient, menu: Menu):
+        """Тест - закешированная страница обновляется после создания меню."""
+        url = app.url_path_for('get_menus')
+        response = await async_client.get(url, params={'limit': 10})
+        assert len(response.json()['items']) == 1, 'Некорректное количество меню на странице'
+        await async_client.post(app.url_path_for('create_menu'), json={'title': 'Новое меню', 'description': ''})
+        response = await async_client.get(url, params={'limit': 10})
+        assert len(response.json()['items']) == 2, 'Страница из кеша не обновилась'
@@ -0,0 +1,107 @@
+import functools
+from pathlib import Path
+
+import httpx
+import pandas
+import pytest
+from fastapi import status
+
+from src.admin.parsers import ExcelParser, StreamingExcelParser
+from src.config import settings
+
+EMPTY = float('nan')
+MENU_ID = 'ff210b5e-3910-11ee-be56-0242ac120002'
+SUBMENU_ID = '13d80f7a-3911-11ee-be56-0242ac120002'
+DISH_ID = '13d81222-3911-11ee-be56-0242ac120002'
+
+
+def get_sheet(*discounts: object) -> pandas.DataFrame:
+    rows = [
+        [MENU_ID, 'Меню', 'Основное меню', EMPTY, EMPTY, 'Price', 'Discount, %'],
+        [EMPTY, SUBMENU_ID, 'Закуски', 'К пиву', EMPTY, EMPTY, EMPTY],
+    ]
+    rows.extend([EMPTY, EMPTY, f'dish-{number}', 'Блюдо', 'Описание', 100.5, discount]
+                for number, discount in enumerate(discounts))
+    return pandas.DataFrame(rows, dtype=object)
+
+
+class TestExcelParser:
+    async def test_parse_admin_excel(self):
+        data = await ExcelParser(source=settings.ADMIN_EXCEL_PATH).parse()
+        assert [len(objects) for objects in data.values()] == [2, 4, 12]
+        assert data['menus'][MENU_ID] == {'id': MENU_ID, 'title': 'Меню', 'description': 'Основное меню'}
+        assert data['submenus'][SUBMENU_ID]['menu_id'] == MENU_ID
+        assert data['dishes'][DISH_ID] == {
+            'id': DISH_ID,
+            'title': 'Сельдь Бисмарк',
+            'description': 'Традиционное немецкое блюдо из маринованной сельди',
+            'price': 182.99,
+            'discount': '0',
+            'menu_id': MENU_ID,
+            'submenu_id': SUBMENU_ID,
+        }
+
+    @pytest.mark.parametrize(
+        ('discount', 'expected'),
+        [(EMPTY, '0'), (15, '0.15'), ('10', '0.1'), (0, '0.0'), (-5, '0'), (150, '1')],
+    )
+    def test_discount_is_clamped(self, discount: object, expected: str):
+        assert ExcelParser.parse_frame(get_sheet(discount))['dishes']['dish-0']['discount'] == expected
+
+    def test_sheet_without_discount_column(self):
+        dishes = ExcelParser.parse_frame(get_sheet(EMPTY, EMPTY).drop(columns=[6]))['dishes']
+        assert [dish['discount'] for dish in dishes.values()] == ['0', '0']
+
+
+class TestStreamingExcelParser:
+    async def test_parse_as_excel_parser(self):
+        data = await StreamingExcelParser(source=settings.ADMIN_EXCEL_PATH).parse()
+        assert data == await ExcelParser(source=settings.ADMIN_EXCEL_PATH).parse()
+
+    async def test_discount_as_excel_parser(self, tmp_path: Path):
+        path = str(tmp_path / 'Menu.xlsx')
+        get_sheet(EMPTY, 15, '10', 0, -5, 150).to_excel(path, header=False, index=False)
+        dishes = (await StreamingExcelParser(source=path).parse())['dishes']
+        assert [dish['discount'] for dish in dishes.values()] == ['0', '0.15', '0.1', '0.0', '0', '1']
+
+    def test_rows_before_parents(self, tmp_path: Path):
+        path = str(tmp_path / 'Menu.xlsx')
+        get_sheet(15).iloc[[2, 1, 0]].to_excel(path, header=False, index=False)
+        kinds = [kind for kind, _ in StreamingExcelParser(source=path).iter_records()]
+        data = StreamingExcelParser(source=path).collect_records()
+        assert kinds == ['dishes', 'submenus', 'menus']
+        assert data['dishes']['dish-0']['menu_id'] is None
+        assert data['dishes']['dish-0']['submenu_id'] is None
+        assert data['submenus'][SUBMENU_ID]['menu_id'] is None
+
+    def test_records_are_lazy(self):
+        records = StreamingExcelParser(source=settings.ADMIN_EXCEL_PATH).iter_records()
+        assert next(records) == ('menus', {'id': MENU_ID, 'title': 'Меню', 'description': 'Основное меню'})
+        assert next(records)[0] == 'submenus'
+        records.close()
+
+    async def test_chunks_as_excel_parser(self):
+        chunks = [chunk async for chunk in StreamingExcelParser(source=settings.ADMIN_EXCEL_PATH).iter_chunks(5)]
+        assert [sum(len(objects) for objects in chunk.values()) for chunk in chunks] == [5, 5, 5, 3]
+        data = await ExcelParser(source=settings.ADMIN_EXCEL_PATH).parse()
+        assert {kind: {uid: row for chunk in chunks for uid, row in chunk[kind].items()} for kind in data} == data
+
+
+class TestParseExecutor:
+    @pytest.mark.parametrize('parser_class', [ExcelParser, StreamingExcelParser])
+    async def test_parse_in_process_pool(
+        self, parser_class: type[ExcelParser | StreamingExcelParser], monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, 'ADMIN_PARSE_EXECUTOR', 'process')
+        data = await parser_class(source=settings.ADMIN_EXCEL_PATH).parse()
+        assert [len(objects) for objects in data.values()] == [2, 4, 12]
+
+    @pytest.mark.parametrize('parser_class', [ExcelParser, StreamingExcelParser])
+    async def test_url_is_downloaded(
+        self, parser_class: type[ExcelParser | StreamingExcelParser], monkeypatch: pytest.MonkeyPatch,
+    ):
+        content = Path(settings.ADMIN_EXCEL_PATH).read_bytes()
+        transport = httpx.MockTransport(lambda _: httpx.Response(status.HTTP_200_OK, content=content))
+        monkeypatch.setattr(httpx, 'AsyncClient', functools.partial(httpx.AsyncClient, transport=transport))
+        data = await parser_class(source='https://sheets.test/export').parse()
+        assert [len(objects) for objects in data.values()] == [2, 4, 12]
@@ -0,0 +1,50 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.config import settings
+from src.core.pool_stats import TimedQueuePool, get_db_pool_report, pools_to_prometheus
+from src.main import app
+from src.redis_conf import redis
+
+
+class TestPoolStats:
+    async def test_checkouts_and_overflow_are_counted(self):
+        engine = create_async_engine(settings.db_test_url, poolclass=TimedQueuePool, pool_size=1, max_overflow=1)
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(text('SELECT 1'))
+            await second.execute(text('SELECT 1'))
+            report = get_db_pool_report(engine.pool)
+            assert (report['checked_out'], report['overflow']) == (2, 1)
+        report = get_db_pool_report(engine.pool)
+        assert (report['checked_out'], report['checkouts'], report['failures']) == (0, 2, 0)
+        await engine.dispose()
+
+    async def test_timeout_is_counted(self):
+        engine = create_async_engine(
+            settings.db_test_url, poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1,
+        )
+        async with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                await engine.connect().start()
+        report = get_db_pool_report(engine.pool)
+        assert report['failures'] == 1
+        assert report['max_wait_seconds'] >= 0.1, 'Ожидание соединения не посчитано'
+        await engine.dispose()
+
+    async def test_prometheus_skips_pools_without_stats(self):
+        metrics = pools_to_prometheus({'postgres': {'class': 'NullPool'}, 'redis': {'checked_out': 1}})
+        assert 'pool_checked_out{pool="redis"} 1' in metrics
+        assert 'pool="postgres"' not in metrics
+
+
+async def test_pools_endpoint(async_client: AsyncClient):
+    await redis.ping()
+    response = await async_client.get(app.url_path_for('get_pools'))
+    assert response.status_code == status.HTTP_200_OK
+    pools = response.json()
+    assert set(pools) >= {'postgres', 'redis'}
+    assert pools['redis']['size'] == settings.REDIS_MAX_CONNECTIONS
+    assert pools['redis']['checkouts'] > 0
@@ -207,3 +207,18 @@ class TestCrudSubmenus:
         assert response.status_code == status.HTTP_404_NOT_FOUND, (
             'Если подменю не существует должно отображать ошибку 404',
         )
+
+    async def test_create_duplicate_submenu(self, async_client: AsyncClient, submenu: SubMenu):
+        """Тест - создать подменю c существующим заголовком."""
+        url = app.url_path_for('create_submenu', menu_id=submenu.menu_id)
+        response = await async_client.post(url, json={'title': submenu.title, 'description': ''})
+        assert response.status_code == status.HTTP_403_FORBIDDEN, 'Некорректный статус код'
+        assert response.json()['detail'] == f'Submenu with title - {submenu.title}, already exist', (
+            'Некорректное сообщение об ошибке',
+        )
+
+    async def test_create_submenu_of_non_exist_menu(self, async_client: AsyncClient):
+        """Тест - создать подменю несуществующего меню."""
+        url = app.url_path_for('create_submenu', menu_id=uuid.uuid4())
+        response = await async_client.post(url, json={'title': 'Подменю', 'description': ''})
+        assert response.status_code == status.HTTP_404_NOT_FOUND, 'Некорректный статус код'
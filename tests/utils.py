@@ -1,7 +1,13 @@
-from sqlalchemy import Column, func, select
+import contextlib
+from collections.abc import Iterator
+from typing import Any
+
+from sqlalchemy import Column, event, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.decl_api import DeclarativeAttributeIntercept as Base
 
+from tests.conftest import engine_test
+
 
 async def get_object(
     db: AsyncSession,
@@ -38,3 +44,27 @@ async def count_objects(db: AsyncSession, model: Base):
     query = select(func.count()).select_from(model)
     objects = await db.execute(query)
     return objects.scalars().first()
+
+
+@contextlib.contextmanager
+def count_statements() -> Iterator[list]:
+    """Collect statements executed in test db."""
+    statements = []
+
+    def count_statement(*args: Any) -> None:
+        statements.append(args[2])
+
+    event.listen(engine_test.sync_engine, 'before_cursor_execute', count_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(engine_test.sync_engine, 'before_cursor_execute', count_statement)
+
+
+def without_order(data: Any) -> Any:
+    """Lists of objects sorted by id, db returns them in any order."""
+    if isinstance(data, dict):
+        return {key: without_order(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return sorted((without_order(item) for item in data), key=lambda item: item['id'])
+    return data